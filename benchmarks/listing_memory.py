@@ -0,0 +1,79 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Compare the memory held by a listing of resource summaries kept as one dict per resource with the
+memory held by a ResourceListing, both built from the same decoded json.
+
+    python benchmarks/listing_memory.py [number of resources]
+"""
+
+import json
+import random
+import sys
+import tracemalloc
+
+from elrc_client.utils.listing import ResourceListing
+
+STATUSES = ['published', 'ingested', 'internal', 'deleted']
+
+
+def payload(n):
+    rnd = random.Random(0)
+    return json.dumps([
+        {'id': i, 'name': 'Parallel corpus {} for the {} domain (EN-EL)'.format(i, rnd.choice(['legal', 'health'])),
+         'status': rnd.choice(STATUSES)}
+        for i in rnd.sample(range(1, n * 10), n)])
+
+
+def retained(build, data):
+    tracemalloc.start()
+    result = build(data)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    data = payload(n)
+    _, dicts = retained(json.loads, data)
+    listing, compact = retained(
+        lambda d: ResourceListing((r['id'], r['name'], r['status']) for r in json.loads(d)), data)
+    print('{:,} resources'.format(len(listing)))
+    print('list of dicts:    {:>10,.1f} KiB'.format(dicts / 1024.0))
+    print('ResourceListing:  {:>10,.1f} KiB ({:.1f}x smaller)'.format(compact / 1024.0, dicts / float(compact)))
+
+
+if __name__ == '__main__':
+    main()
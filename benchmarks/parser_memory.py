@@ -0,0 +1,91 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Compare the memory held by parsed descriptions in the default (OrderedDict), lean and lean + frozen lists
+output modes of parser.parse, on large synthetic descriptions. Each mode is measured in a fresh process, so
+the keys and values interned by one lean mode are not charged to (or saved for) the next one.
+
+    python benchmarks/parser_memory.py [number of descriptions] [languages per description]
+"""
+
+import multiprocessing
+import sys
+import time
+import tracemalloc
+
+from elrc_client.utils import synthetic
+from elrc_client.utils.xml import parser
+
+MODES = [
+    ('default', {}),
+    ('lean', {'lean': True}),
+    ('lean + freeze_lists', {'lean': True, 'freeze_lists': True}),
+]
+
+
+def descriptions(count, languages):
+    # synthetic descriptions are seeded per resource, so every process parses the same input
+    return [synthetic.description(i, languages=(languages, languages), distributions=(3, 3),
+                                  relations=(10, 10)).encode('utf-8') for i in range(count)]
+
+
+def measure(options, count, languages):
+    data = descriptions(count, languages)
+    tracemalloc.start()
+    start = time.perf_counter()
+    parsed = [parser.parse(d, **options) for d in data]
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del parsed
+    return size, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    languages = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+    print('{:,} descriptions, {:,.1f} KiB of xml'.format(
+        count, sum(len(d) for d in descriptions(count, languages)) / 1024.0))
+    context = multiprocessing.get_context('spawn')
+    baseline = None
+    for name, options in MODES:
+        with context.Pool(1) as pool:
+            size, elapsed = pool.apply(measure, (options, count, languages))
+        baseline = baseline or size
+        print('{:<22}{:>12,.1f} KiB{:>8.2f}x smaller{:>10.2f}s'.format(name, size / 1024.0, baseline / float(size),
+                                                                     elapsed))
+
+
+if __name__ == '__main__':
+    main()
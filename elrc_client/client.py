@@ -35,16 +35,33 @@
 
 import atexit
 import json
+import threading
+import time
 import zipfile
+from concurrent.futures import CancelledError, ThreadPoolExecutor, as_completed
 
 import os
 
 import requests
 import httplib
+from lxml import etree
 from elrc_client.settings import LOGIN_URL, API_ENDPOINT, LOGOUT_URL, API_OPERATIONS, DOWNLOAD_DIR
+from elrc_client.settings import INITIAL_CONCURRENCY, MIN_CONCURRENCY, MAX_CONCURRENCY, REQUEST_RETRIES, \
+    REQUEST_TIMEOUT, REQUEST_BACKOFF, REQUEST_BACKOFF_MAX, API_PAGE_SIZE, PARSE_CACHE_DIR, PARSE_CACHE_SIZE, \
+    RESOURCE_CACHE_TTL, RESOURCE_CACHE_SIZE
 from elrc_client.settings import logging
-from elrc_client.utils.util import is_xml
+from elrc_client.utils import export, pipeline
+from elrc_client.utils.cache import ResourceCache
+from elrc_client.utils.concurrency import AdaptiveLimiter, OVERLOAD_STATUS_CODES, backoff_delay, parse_retry_after
+from elrc_client.utils.listing import LISTING_FIELDS, ResourceListing, project, summarize, with_id
+from elrc_client.utils.profiling import Profile, phase, IO, SERIALIZE
+from elrc_client.utils.search import MetadataIndex
+from elrc_client.utils.util import description_schema, is_xml, progress as show_progress
+from elrc_client.utils.zipstream import extract
+from elrc_client.utils.workqueue import Heartbeat, LEASED, PENDING, worker_name
 from elrc_client.utils.xml import parser
+from elrc_client.utils.xml.cache import ParseCache
+from elrc_client.utils.xml.validation import validate_and_parse
 
 
 def to_dict(input_ordered_dict):
@@ -61,9 +78,36 @@ class ELRCShareClient:
             'Content-Type': 'application/json',
             'Referer': 'https://www.elrc-share.eu/'
         }
+        self.limiter = AdaptiveLimiter(initial=INITIAL_CONCURRENCY, min_limit=MIN_CONCURRENCY,
+                                       max_limit=MAX_CONCURRENCY)
+        # search index over the metadata of all the resources fetched by this client
+        self.index = MetadataIndex()
+        self.cache = ResourceCache(ttl=RESOURCE_CACHE_TTL, max_bytes=RESOURCE_CACHE_SIZE)
+        # whether the editor API supports filtering by a list of ids (None until known)
+        self.id_filter_supported = None
+        # the on-disk parse cache is only opened when a description is first parsed
+        self.parse_cache_dir = PARSE_CACHE_DIR
+        self._parse_cache = None
+        self._parse_cache_lock = threading.Lock()
 
         atexit.register(self.logout)
 
+    @property
+    def parse_cache(self):
+        """The on-disk cache of parsed descriptions, opened on first use (None if disabled)"""
+        if self._parse_cache is None and self.parse_cache_dir:
+            with self._parse_cache_lock:
+                if self._parse_cache is None:
+                    self._parse_cache = ParseCache(self.parse_cache_dir, max_bytes=PARSE_CACHE_SIZE)
+        return self._parse_cache
+
+    @parse_cache.setter
+    def parse_cache(self, cache):
+        """Set a ParseCache, or None to disable caching"""
+        self._parse_cache = cache
+        if cache is None:
+            self.parse_cache_dir = None
+
     def login(self, username, password):
         try:
             self.session = requests.session()
@@ -104,10 +148,467 @@ class ELRCShareClient:
         else:
             pass
 
-    def _create_resource(self, description, dataset=None):
+    def _request(self, method, url, measure=True, **kwargs):
+        """
+        Send a request through the adaptive concurrency limiter, retrying it when the server
+        answers 429/503 or does not respond in time.
+        :param method: HTTP method
+        :param url: Request url
+        :param measure: Whether the request latency may grow the concurrency limit (disabled for
+        transfers whose duration depends on the size of the payload)
+        :return: The last response received
+        """
+        kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+        for attempt in range(REQUEST_RETRIES + 1):
+            # rewind files consumed by a previous attempt
+            for f in (kwargs.get('files') or {}).values():
+                f.seek(0)
+            self.limiter.acquire()
+            start = time.time()
+            try:
+                with phase(IO):
+                    response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.Timeout:
+                self.limiter.release(overloaded=True)
+                if attempt == REQUEST_RETRIES:
+                    raise
+                logging.warning('Request timed out, retrying...')
+                time.sleep(backoff_delay(attempt, REQUEST_BACKOFF, REQUEST_BACKOFF_MAX))
+                continue
+            except Exception:
+                self.limiter.release()
+                raise
+            overloaded = response.status_code in OVERLOAD_STATUS_CODES
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.limiter.release(latency=time.time() - start if measure else None, overloaded=overloaded,
+                                 retry_after=retry_after)
+            if not overloaded or attempt == REQUEST_RETRIES:
+                return response
+            logging.warning('{} Server busy, retrying...'.format(response.status_code))
+            # a Retry-After delay is enforced by the limiter for all requests
+            if retry_after is None:
+                time.sleep(backoff_delay(attempt, REQUEST_BACKOFF, REQUEST_BACKOFF_MAX))
 
-        # reset headers
-        self.headers = {
+    def iter_resources(self, my=False, fields=None):
+        """
+        Iterate over all the resources accessible by the user, one page of resources at a time.
+        :param my: Only return the resources that the user owns
+        :param fields: Only return the id and these fields of each record (see utils.listing.project)
+        :return: Generator of resource records, as returned by the editor API
+        """
+        if not self.logged_in:
+            logging.error("Please login to ELRC-SHARE using your credentials")
+            return
+        params = dict(self._projection(fields), format='json', limit=API_PAGE_SIZE, offset=0)
+        if my:
+            params['my'] = 'true'
+        while True:
+            try:
+                response = self._request('get', API_ENDPOINT, params=params)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                logging.error('Could not connect to remote host.')
+                return
+            if response.status_code != httplib.OK:
+                logging.error('{} Could not retrieve resources'.format(response.status_code))
+                return
+            page = response.json()
+            for record in page.get('objects', []):
+                if fields:
+                    yield project(record, fields)
+                    continue
+                self.index.add(record)
+                yield record
+            if not page.get('meta', {}).get('next'):
+                return
+            params['offset'] += params['limit']
+
+    @staticmethod
+    def _projection(fields):
+        """
+        Request parameters asking the editor API for the given fields only. Servers that do not support field
+        selection ignore them and the records are trimmed client-side.
+        """
+        if not fields:
+            return {}
+        return {'fields': ','.join(with_id(fields))}
+
+    def _fetch_batch(self, ids, fields=None):
+        """
+        Fetch the records of a batch of ids with a single id__in filtered request.
+        :return: The records, or None if the editor API does not filter by id
+        """
+        response = self._request('get', API_ENDPOINT, params=dict(
+            self._projection(fields), format='json', limit=len(ids), id__in=','.join(str(i) for i in ids)))
+        if response.status_code == httplib.BAD_REQUEST:
+            return None
+        if response.status_code != httplib.OK:
+            raise requests.exceptions.HTTPError('{} Could not retrieve resources'.format(response.status_code),
+                                                response=response)
+        records = response.json().get('objects', [])
+        # a server that ignores the filter returns other resources
+        if any(int(record['id']) not in ids for record in records):
+            return None
+        if fields:
+            return [project(record, fields) for record in records]
+        return records
+
+    def get_resources(self, ids=None, my=False, batch_size=API_PAGE_SIZE, fields=None):
+        """
+        Get the metadata of many resources as python dictionaries.
+        Specific ids are fetched in batches of `batch_size` ids per request when the editor API supports
+        filtering by id list, and with parallel requests for one resource each otherwise (and for the ids of the
+        batches that failed).
+        :param ids: The resource ids to fetch (defaults to all the accessible resources)
+        :param my: Only return the resources that the user owns (when no ids are given)
+        :param batch_size: Number of ids requested at once
+        :param fields: Only return the id and these fields of each record (see utils.listing.project)
+        :return: A dictionary of resource id -> record; ids that could not be retrieved are left out
+        """
+        if ids is None:
+            return dict((int(record['id']), record) for record in self.iter_resources(my=my, fields=fields))
+        if not self.logged_in:
+            logging.error("Please login to ELRC-SHARE using your credentials")
+            return {}
+        ids = sorted(set(int(i) for i in ids))
+        results = {}
+        # ids that could not be fetched in a batch, retried one by one
+        missing = set()
+        if self.id_filter_supported is not False:
+            batches = [set(ids[i:i + batch_size]) for i in range(0, len(ids), batch_size)]
+            with ThreadPoolExecutor(max_workers=self.limiter.max_limit) as executor:
+                futures = dict((executor.submit(self._fetch_batch, batch, fields), batch) for batch in batches)
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    try:
+                        records = future.result()
+                    except CancelledError:
+                        missing.update(batch)
+                        continue
+                    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                            requests.exceptions.HTTPError) as e:
+                        logging.error('Could not retrieve resources {}: {}'.format(
+                            ', '.join(str(i) for i in sorted(batch)), e))
+                        missing.update(batch)
+                        continue
+                    if records is None:
+                        # the server does not filter by id: fetch the remaining ids one by one
+                        self.id_filter_supported = False
+                        for pending in futures:
+                            pending.cancel()
+                        missing.update(batch)
+                        continue
+                    self.id_filter_supported = True
+                    # ids left out of the response (e.g. a server that caps the page size) are fetched one by one
+                    missing.update(batch.difference(int(record['id']) for record in records))
+                    for record in records:
+                        resource_id = int(record['id'])
+                        results[resource_id] = record
+                        # partial records are neither indexed nor cached
+                        if fields:
+                            continue
+                        self.index.add(record)
+                        self.cache.put(('json', str(resource_id)),
+                                       json.dumps(record, ensure_ascii=False).encode('utf-8'))
+        else:
+            missing.update(ids)
+        missing = sorted(missing)
+        if missing:
+            for resource_id, record, error in pipeline.run(
+                    lambda resource_id: self.get_resource(resource_id, fields=fields), missing,
+                    workers=self.limiter.max_limit):
+                if error is None:
+                    results[resource_id] = record
+        for resource_id in ids:
+            if resource_id not in results:
+                logging.error('Resource {} could not be retrieved'.format(resource_id))
+        return results
+
+    def export(self, output_dir, ids=None, my=False, formats=('csv',), chunk_size=10000):
+        """
+        Export the metadata of resources as flat resources, languages, sizes, distributions and licences tables
+        (see utils.export), streaming the resources page by page.
+        :param output_dir: Directory where a sub-directory of part files is written for each table
+        :param ids: The resource ids to export (defaults to all the accessible resources)
+        :param my: Only export the resources that the user owns (when no ids are given)
+        :param formats: 'csv' and/or 'parquet' (requires pyarrow)
+        :param chunk_size: Number of rows per part file
+        :return: A dictionary of table name -> paths of the written part files
+        """
+        if ids is None:
+            records = self.iter_resources(my=my)
+        else:
+            records = self.get_resources(ids=ids).values()
+        return export.export(records, output_dir, formats=formats, chunk_size=chunk_size)
+
+    def list(self, my=False, raw=True):
+        """
+        List the id, name and publication status of the resources accessible by the user.
+        :param my: Only list the resources that the user owns
+        :param raw: Return the listing as tab delimited text instead of a ResourceListing
+        :return: Tab delimited text, one resource per line, or a ResourceListing, ordered by id
+        """
+        listing = ResourceListing(summarize(record) for record in self.iter_resources(my=my, fields=LISTING_FIELDS))
+        if raw:
+            return listing.to_tsv()
+        return listing
+
+    def get_resource(self, resource_id, as_json=False, as_xml=False, pretty=False, save=False, fields=None):
+        """
+        Retrieve the metadata of a resource.
+        :param resource_id: ELRC-SHARE resource id
+        :param as_json: Return the metadata as a json string
+        :param as_xml: Return the metadata as an xml string
+        :param pretty: Pretty print the json/xml output
+        :param save: Save the json/xml output as resource-<id>.json/.xml in DOWNLOAD_DIR and return the file path
+        :param fields: Only return the id and these fields of the record (see utils.listing.project); not supported with
+        as_xml
+        :return: A python dictionary (or a json/xml string, or a file path), None if the resource could not be
+        retrieved
+        """
+        if not self.logged_in:
+            logging.error("Please login to ELRC-SHARE using your credentials")
+            return None
+        if fields and as_xml:
+            logging.error('Field selection is not supported for xml output')
+            return None
+
+        def fetch():
+            if as_xml:
+                response = self._request('get', "{}export_xml/{}/".format(API_OPERATIONS, resource_id))
+            else:
+                response = self._request('get', "{}{}/".format(API_ENDPOINT, resource_id),
+                                         params={'format': 'json'})
+            if response.status_code != httplib.OK:
+                logging.error('{} Could not retrieve resource {}'.format(response.status_code, resource_id))
+                return None
+            return response.content
+
+        def fetch_fields():
+            response = self._request('get', "{}{}/".format(API_ENDPOINT, resource_id),
+                                     params=dict(self._projection(fields), format='json'))
+            if response.status_code != httplib.OK:
+                logging.error('{} Could not retrieve resource {}'.format(response.status_code, resource_id))
+                return None
+            return json.dumps(project(response.json(), fields), ensure_ascii=False).encode('utf-8')
+
+        try:
+            if fields:
+                # partial records bypass the cache, unless the full record is cached already
+                content = self.cache.peek(('json', str(resource_id)))
+                if content is not None:
+                    content = json.dumps(project(json.loads(content.decode('utf-8')), fields),
+                                         ensure_ascii=False).encode('utf-8')
+                else:
+                    content = fetch_fields()
+            else:
+                content = self.cache.get(('xml' if as_xml else 'json', str(resource_id)), fetch)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            logging.error('Could not connect to remote host.')
+            return None
+        if content is None:
+            return None
+        if as_xml:
+            result = content
+            if pretty:
+                result = etree.tostring(etree.fromstring(result), pretty_print=True, encoding='utf-8',
+                                        xml_declaration=True)
+            result = result.decode('utf-8')
+            extension = 'xml'
+        else:
+            result = json.loads(content.decode('utf-8'))
+            if not fields:
+                self.index.add(result)
+            if not as_json:
+                return result
+            with phase(SERIALIZE):
+                result = json.dumps(result, ensure_ascii=False, indent=4 if pretty else None)
+            extension = 'json'
+        if save:
+            path = os.path.join(DOWNLOAD_DIR, 'resource-{}.{}'.format(resource_id, extension))
+            with open(path, 'w', encoding='utf-8') as out:
+                out.write(result)
+            return path
+        return result
+
+    def _iter_download(self, response, name, progress):
+        total = int(response.headers.get('Content-Length') or 0)
+        received = 0
+        chunks = response.iter_content(chunk_size=1 << 16)
+        while True:
+            with phase(IO):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            received += len(chunk)
+            if progress and total:
+                show_progress(received, total, status=name)
+            yield chunk
+
+    def download_data(self, resource_id, dest=None, progress=True, extract_to=None, members=None):
+        """
+        Download the dataset of a resource as archive-<id>.zip, or extract its members while it is downloaded.
+        :param resource_id: ELRC-SHARE resource id
+        :param dest: The directory where the archive is saved (defaults to DOWNLOAD_DIR)
+        :param progress: Show a progress bar
+        :param extract_to: Extract the archive members into this directory as the download arrives, without
+        saving the archive (from the first member that can not be streamed on, the rest of the archive is
+        extracted from a spooled temporary file)
+        :param members: Glob patterns of the members to extract, e.g. ['*.tmx'] (used with extract_to)
+        :return: The path of the downloaded archive, or the paths of the extracted files with extract_to, None if
+        the dataset could not be downloaded
+        """
+        if not self.logged_in:
+            logging.error("Please login to ELRC-SHARE using your credentials")
+            return None
+        url = "{}download_data/{}/".format(API_OPERATIONS, resource_id)
+        name = 'archive-{}.zip'.format(resource_id)
+        path = os.path.join(dest or DOWNLOAD_DIR, name)
+        try:
+            response = self._request('get', url, measure=False, stream=True)
+            if response.status_code != httplib.OK:
+                logging.error('{} Could not download dataset of resource {}'.format(response.status_code,
+                                                                                    resource_id))
+                return None
+            if extract_to:
+                return extract(self._iter_download(response, name, progress), extract_to, members)
+            with open(path, 'wb') as out:
+                for chunk in self._iter_download(response, name, progress):
+                    out.write(chunk)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            logging.error('Could not connect to remote host.')
+            return None
+        except zipfile.BadZipFile as e:
+            logging.error('Invalid dataset archive for resource {}: {}'.format(resource_id, e))
+            return None
+        return path
+
+    def pipeline(self, ids, operation='getj', ordered=True, workers=None, **kwargs):
+        """
+        Run a retrieval operation for many resource ids on a pool of workers.
+        Failures are reported in the results and do not stop the batch.
+        :param ids: Iterable of resource ids, e.g. pipeline.read_ids(sys.stdin)
+        :param operation: 'getj' (json metadata), 'getx' (xml metadata) or 'download' (dataset archive)
+        :param ordered: Yield results in input order (True) or in completion order (False)
+        :param workers: Number of workers (defaults to the maximum concurrency)
+        :param kwargs: Extra arguments for get_resource (pretty, save) or download_data (dest)
+        :return: Generator of (resource_id, result, error) tuples
+        """
+        if operation == 'getj':
+            func = lambda resource_id: self.get_resource(resource_id, as_json=True, **kwargs)
+        elif operation == 'getx':
+            func = lambda resource_id: self.get_resource(resource_id, as_xml=True, **kwargs)
+        elif operation == 'download':
+            func = lambda resource_id: self.download_data(resource_id, progress=False, **kwargs)
+        else:
+            raise ValueError('Unknown operation: {}'.format(operation))
+        return pipeline.run(func, ids, workers=workers or self.limiter.max_limit, ordered=ordered)
+
+    @staticmethod
+    def _lease_lost(lease):
+        """
+        Check the lease of the work item being processed (a Heartbeat, or None outside of a work queue) before
+        a step with side effects on the server.
+        """
+        if lease is not None and lease.lost:
+            logging.warning('Lost the lease of work item {}, skipping its remaining steps'.format(lease.item.id))
+            return True
+        return False
+
+    @staticmethod
+    def _succeeded(result):
+        # a batch creation succeeded if at least one of its resources was created
+        if isinstance(result, list):
+            return any(r is not None for r in result)
+        return bool(result)
+
+    def _run_work_item(self, item, lease=None):
+        payload = item.payload
+        if self._lease_lost(lease):
+            return None
+        if item.operation == 'create':
+            return self.create(payload['file'], dataset=payload.get('dataset'), lease=lease)
+        elif item.operation == 'upload':
+            return self.upload_data(payload['resource_id'], payload['data_file'])
+        elif item.operation == 'download':
+            return self.download_data(payload['resource_id'], dest=payload.get('dest'), progress=False,
+                                      extract_to=payload.get('extract_to'), members=payload.get('members'))
+        raise ValueError('Unknown operation: {}'.format(item.operation))
+
+    def process_queue(self, queue, workers=None, poll=5):
+        """
+        Process the items of a shared WorkQueue ('create', 'upload' and 'download' operations) until no work is
+        left. Several processes, on one or more machines, can process the same queue at the same time.
+        A 'create' item of a directory is done once any of its resources was created, so a retry never creates
+        them again; the files that failed are logged.
+        :param queue: A WorkQueue, e.g. WorkQueue('/shared/migration.db')
+        :param workers: Number of worker threads in this process (defaults to the maximum concurrency)
+        :param poll: Seconds to wait before checking again for items leased by other workers, which are
+        re-leased if their worker crashes
+        :return: Number of items completed by this process
+        """
+        if not self.logged_in:
+            logging.error("Please login to ELRC-SHARE using your credentials")
+            return 0
+        completed = []
+
+        def work():
+            name = worker_name()
+            while True:
+                item = queue.lease(name)
+                if item is None:
+                    counts = queue.counts()
+                    if not counts[PENDING] and not counts[LEASED]:
+                        return
+                    time.sleep(poll)
+                    continue
+                logging.info('{} {} {}'.format(name, item.operation, item.payload))
+                with Heartbeat(queue, item) as heartbeat:
+                    try:
+                        result = self._run_work_item(item, lease=heartbeat)
+                        error = None if self._succeeded(result) else 'failed'
+                    except Exception as e:
+                        result, error = None, e
+                # the item of a lost lease is processed by another worker
+                if error is not None and not heartbeat.lost:
+                    logging.error('Work item {} failed: {}'.format(item.id, error))
+                    queue.fail(item, error)
+                elif not heartbeat.lost and queue.complete(item, result):
+                    completed.append(item.id)
+                else:
+                    logging.warning('Lost the lease of work item {}, it was leased by another worker'.format(item.id))
+
+        threads = [threading.Thread(target=work) for _ in range(workers or self.limiter.max_limit)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return len(completed)
+
+    def profile(self, name='elrc', cpu=True, memory=False):
+        """
+        Profile the client calls made in a `with` block. A report with the time spent in the parse, serialize,
+        merge and io phases, the CPU profile and, optionally, the top allocation sites is written to
+        DOWNLOAD_DIR as profile-<name>-<timestamp>.txt, along with a .prof file for pstats/snakeviz.
+        :param name: Name used in the report file names
+        :param cpu: Collect a cProfile CPU profile
+        :param memory: Collect a tracemalloc allocation snapshot
+        :return: A Profile context manager
+        """
+        return Profile(name, cpu=cpu, memory=memory, output_dir=DOWNLOAD_DIR)
+
+    def search(self, text=None, **facets):
+        """
+        Search the metadata of the resources fetched so far (see MetadataIndex.search).
+        Call `get_resources` or `iter_resources` (without fields) first to index all accessible resources.
+        :param text: Words that must all appear in the resource name or description
+        :param facets: Facet values to match, e.g. status='published', language=['en', 'el']
+        :return: The sorted ids of the matching resources
+        """
+        return self.index.search(text, **facets)
+
+    def _create_resource(self, description, dataset=None, lease=None):
+
+        headers = {
             'Content-Type': 'application/json'
         }
 
@@ -122,14 +623,19 @@ class ELRCShareClient:
 
         resource_name = description.get('resourceInfo').get('identificationInfo').get('resourceName').get('en')
         # print(json.dumps(description, ensure_ascii=False))
+        with phase(SERIALIZE):
+            payload = json.dumps(description, ensure_ascii=False).encode('utf-8')
+        if self._lease_lost(lease):
+            return None
         try:
-            request = self.session.post(API_ENDPOINT, headers=self.headers,
-                                        data=json.dumps(description, ensure_ascii=False).encode('utf-8'))
+            request = self._request('post', API_ENDPOINT, headers=headers, data=payload)
 
             if request.status_code == httplib.CREATED:
                 print("Metadata created")
                 new_id = json.loads(request.content).get('ID')
                 print("Resource '{}' has been created\nID: {}".format(resource_name, new_id))
+                if self._lease_lost(lease):
+                    return new_id
                 try:
                     self.upload_data(new_id, data_file=dataset)
                 except Exception as e:
@@ -142,49 +648,127 @@ class ELRCShareClient:
                 logging.error(request.text)
         except requests.exceptions.ConnectionError:
             logging.error('Could not connect to remote host.')
+        except requests.exceptions.Timeout:
+            logging.error('Remote host did not respond in time.')
 
-    def create(self, file, dataset=None):
+    def _parse_file(self, file, validate=False):
+        # descriptions are only serialized to json, so the lean parser output can be used
+        if validate:
+            try:
+                schema = description_schema()
+            except (etree.XMLSchemaParseError, etree.XMLSyntaxError, IOError) as e:
+                logging.error('Could not load schema: {}'.format(e))
+                return None
+            try:
+                with open(file, 'rb') as inp:
+                    return validate_and_parse(inp, schema, lean=True)
+            except etree.XMLSyntaxError as e:
+                logging.error('Invalid description {}: {}'.format(file, e))
+                return None
+        try:
+            if self.parse_cache is not None:
+                return self.parse_cache.parse_file(file, lean=True)
+            with open(file, 'rb') as inp:
+                return parser.parse(inp, lean=True)
+        except parser.expat.ExpatError as e:
+            logging.error('Invalid description {}: {}'.format(file, e))
+        except (IOError, OSError) as e:
+            logging.error('Could not read description {}: {}'.format(file, e))
+        return None
+
+    def _create_from_file(self, file, validate=False, lease=None):
+        logging.info('Processing file: {}'.format(file))
+        data = self._parse_file(file, validate=validate)
+        if data is None:
+            return None
+        attached_dataset = '{}.zip'.format(os.path.splitext(file)[0])
+        if zipfile.is_zipfile(attached_dataset):
+            logging.info('Dataset {} found'.format(attached_dataset))
+            return self._create_resource(data, dataset=attached_dataset, lease=lease)
+        else:
+            logging.info('No dataset found for this resource')
+            return self._create_resource(data, lease=lease)
+
+    def create(self, file, dataset=None, validate=False, lease=None):
         """
         Create one or more resources on ELRC-SHARE repository.
         :param file: Path to resource description xml file or a directory containing xml descriptions
         :param dataset: Optional path to associated dataset (used for single resource creation)
-        :return:
+        :param validate: Validate the descriptions against the local copy of the schema (XML_SCHEMA_FILE in settings)
+        while parsing them; invalid descriptions are not created
+        :param lease: Heartbeat of the work item being processed (see process_queue); once its lease is lost, no
+        further resources are created or datasets uploaded
+        :return: The new resource id, or a list of new ids (None for failures) for batch creation
         """
         if not self.logged_in:
             logging.error("Please login to ELRC-SHARE using your credentials")
             return
         if os.path.isdir(file):
-            for f in os.listdir(file):
-                data = None
-                if is_xml(f):
-                    logging.info('Processing file: {}'.format(f))
-                    with open(os.path.join(file, f), 'r') as inp:
-                        data = parser.parse(inp.read())
-                    attached_dataset = os.path.join(file, f.replace('.xml', '.zip'))
-                    if zipfile.is_zipfile(attached_dataset):
-                        logging.info('Dataset {} found'.format(attached_dataset))
-                        self._create_resource(data, dataset=attached_dataset)
-                    else:
-                        logging.info('No dataset found for this resource'.format(attached_dataset))
-                        self._create_resource(data)
+            xml_files = [os.path.join(file, f) for f in os.listdir(file) if is_xml(f)]
+
+            def create_file(xml_file):
+                # a failure is reported in the slot of its file without stopping the batch
+                try:
+                    return self._create_from_file(xml_file, validate=validate, lease=lease)
+                except Exception as e:
+                    logging.error('Could not create resource from {}: {}'.format(xml_file, e))
+                    return None
+
+            # the limiter decides how many of the workers may talk to the server at once
+            with ThreadPoolExecutor(max_workers=self.limiter.max_limit) as executor:
+                return list(executor.map(create_file, xml_files))
         else:
             logging.info('Processing file: {}'.format(file))
-            with open(os.path.join(os.path.dirname(__file__), file), 'r') as f:
-                data = parser.parse(f.read())
-            return self._create_resource(data, dataset=dataset)
+            data = self._parse_file(os.path.join(os.path.dirname(__file__), file), validate=validate)
+            if data is None:
+                return None
+            return self._create_resource(data, dataset=dataset, lease=lease)
+
+    def create_bulk(self, export_file):
+        """
+        Create a resource for each resourceInfo element of a bulk export file. Descriptions are parsed
+        incrementally and sent to the repository as soon as they are read, so only a few of them are held
+        in memory at any time.
+        :param export_file: Path to an xml file with many resourceInfo elements under a common root element
+        :return: A list of new resource ids (None for failures), in document order
+        """
+        if not self.logged_in:
+            logging.error("Please login to ELRC-SHARE using your credentials")
+            return
+        # bound the number of parsed descriptions waiting for a worker
+        pending = threading.BoundedSemaphore(2 * self.limiter.max_limit)
+
+        def create(description):
+            try:
+                return self._create_resource(description)
+            finally:
+                pending.release()
+
+        logging.info('Processing file: {}'.format(export_file))
+        futures = []
+        with open(export_file, 'rb') as inp, ThreadPoolExecutor(max_workers=self.limiter.max_limit) as executor:
+            for description in parser.iterparse(inp, lean=True):
+                if 'resourceInfo' not in description:
+                    continue
+                pending.acquire()
+                futures.append(executor.submit(create, description))
+        return [future.result() for future in futures]
+
+    def invalidate(self, resource_id):
+        """
+        Drop a resource from the in-memory cache, so that it is fetched again on its next retrieval.
+        """
+        for kind in ('json', 'xml'):
+            self.cache.invalidate((kind, str(resource_id)))
 
     def upload_data(self, resource_id, data_file):
         """
         Upload a .zip dataset for the given resource
         :param resource_id: ELRC-SHARE resource id
         :param data_file: Path to the .zip file to be uploaded
+        :return: True if the dataset was uploaded
         """
 
-        # reset headers
-        self.headers = {
-            'Content-Type': 'application/json'
-        }
-
         if not self.logged_in:
             logging.error("Please login to ELRC-SHARE using your credentials")
             return
@@ -194,11 +778,7 @@ class ELRCShareClient:
             logging.error('Not a valid zip archive')
             return
         else:
-            try:
-                del self.headers['Content-Type']
-            except KeyError:
-                pass
-            self.headers.update({'X-CSRFToken': self.session.cookies['csrftoken']})
+            headers = {'X-CSRFToken': self.session.cookies['csrftoken']}
             url = "{}upload_data/{}/".format(API_OPERATIONS, resource_id)
             data = {
                 'csrfmiddlewaretoken': self.session.cookies['csrftoken'],
@@ -207,9 +787,13 @@ class ELRCShareClient:
 
             print('Uploading dataset {} ({:,.2f}Mb)'.format(data_file, os.path.getsize(data_file) / (1024 * 1024.0)))
 
-            response = self.session.post(url, files={'resource': open(data_file, 'rb')}, data=data)
+            with open(data_file, 'rb') as resource:
+                response = self._request('post', url, measure=False, headers=headers,
+                                         files={'resource': resource}, data=data)
+            self.invalidate(resource_id)
             if response.status_code is not 200:
                 logging.error("Could not upload dataset for the given resource id ({})".format(resource_id))
             else:
                 print(response.text)
+                return True
 
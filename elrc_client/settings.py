@@ -50,6 +50,31 @@ API_ENDPOINT = '%s/repository/api/editor/lr/' % REPO_URL
 API_OPERATIONS = '%s/repository/api/operations/' % REPO_URL
 XML_UPLOAD_URL = '%s/repository/api/create/' % REPO_URL
 XML_SCHEMA = 'https://elrc-share.eu/ELRC-SHARE_SCHEMA/v2.0/ELRC-SHARE-Resource.xsd'
+# Path of a local copy of XML_SCHEMA (with the schemas it includes), used to validate descriptions: lxml can not
+# load schemas over https. Defaults to the ELRC_SHARE_SCHEMA environment variable.
+XML_SCHEMA_FILE = os.environ.get('ELRC_SHARE_SCHEMA')
+
+# Adaptive concurrency limits for requests to the repository
+INITIAL_CONCURRENCY = 4
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 16
+# Number of times a request is retried after a 429/503 response or a timeout
+REQUEST_RETRIES = 3
+# Base and maximum delay (seconds) of the exponential backoff between retries, when the server gives no Retry-After
+REQUEST_BACKOFF = 0.5
+REQUEST_BACKOFF_MAX = 30
+# Seconds to wait for the server to respond before a request counts as timed out
+REQUEST_TIMEOUT = 60
+# Number of resources requested per page when listing resources
+API_PAGE_SIZE = 100
+
+# Time to live (seconds) and size limit (bytes) of the in-memory cache of fetched resources (set the size to 0 to
+# disable)
+RESOURCE_CACHE_TTL = 300
+RESOURCE_CACHE_SIZE = 64 * 1024 * 1024
+# Directory and size limit (bytes) of the on-disk cache of parsed xml descriptions (set to None to disable)
+PARSE_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.elrc-share', 'parse-cache')
+PARSE_CACHE_SIZE = 256 * 1024 * 1024
 
 # Set default directory for downloads
 if os.name == 'posix':
@@ -32,15 +32,21 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import json
 import sys
+import tempfile
+import zipfile
 
 import os
 
 sys.path.append('C:\\Users\\Unicorn\\PycharmProjects\\elrc_client')
 
-from unittest import TestCase, main
-from elrc_client.settings import DOWNLOAD_DIR
+from unittest import TestCase, main, mock
+from elrc_client.settings import API_ENDPOINT, DOWNLOAD_DIR
 from elrc_client.client import ELRCShareClient
+from elrc_client.tests.test_parser import SCHEMA
+from elrc_client.tests.test_utils import _UnseekableWriter
+from elrc_client.utils.workqueue import WorkQueue, DONE, FAILED
 
 
 class TestAuth(TestCase):
@@ -104,5 +110,275 @@ class TestOperations(TestCase):
         self.assertTrue(response, 201)
 
 
+def response(status_code=200, json=None, content=b'', headers=None):
+    return mock.Mock(status_code=status_code, headers=headers or {}, content=content,
+                     json=mock.Mock(return_value=json))
+
+
+class TestParseCache(TestCase):
+
+    def test_parse_cache_is_opened_on_first_use(self):
+        directory = tempfile.mkdtemp()
+        with mock.patch('elrc_client.client.ParseCache') as cache_class:
+            client = ELRCShareClient()
+            cache_class.assert_not_called()
+            client.parse_cache_dir = directory
+            self.assertIs(client.parse_cache, cache_class.return_value)
+            self.assertIs(client.parse_cache, cache_class.return_value)
+        cache_class.assert_called_once_with(directory, max_bytes=mock.ANY)
+
+    def test_parse_cache_can_be_disabled(self):
+        client = ELRCShareClient()
+        client.parse_cache = None
+        self.assertIsNone(client.parse_cache)
+
+
+class TestRequestRetries(TestCase):
+
+    def setUp(self):
+        self.client = ELRCShareClient()
+        # tests do not use the parse cache in the home directory
+        self.client.parse_cache = None
+        self.client.session = mock.Mock()
+
+    def test_backs_off_without_retry_after(self):
+        self.client.session.request.side_effect = [response(503), response(429), response(200)]
+        with mock.patch('elrc_client.client.time.sleep') as sleep:
+            self.assertEqual(self.client._request('get', 'url').status_code, 200)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertLessEqual(sleep.call_args_list[1][0][0], 1.0)
+
+    def test_retry_after_replaces_backoff(self):
+        self.client.session.request.side_effect = [response(503, headers={'Retry-After': '0'}), response(200)]
+        with mock.patch('elrc_client.client.time.sleep') as sleep:
+            self.assertEqual(self.client._request('get', 'url').status_code, 200)
+        sleep.assert_not_called()
+
+
+DESCRIPTION = {'resourceInfo': {'identificationInfo': {'resourceName': {'en': 'Corpus'}},
+                                'resourceComponentType': {'corpusInfo': {}}}}
+
+
+class TestProcessQueue(TestCase):
+
+    def setUp(self):
+        self.client = ELRCShareClient()
+        self.client.parse_cache = None
+        self.client.logged_in = True
+        self.queue = WorkQueue(os.path.join(tempfile.mkdtemp(), 'queue.db'), max_attempts=1)
+
+    def tearDown(self):
+        self.client.logged_in = False
+
+    def test_batch_creation_without_created_resources_fails(self):
+        self.queue.put('create', file='descriptions')
+        self.queue.put('create', file='other-descriptions')
+        with mock.patch.object(self.client, 'create', side_effect=[[None, None], [None, 12]]):
+            self.assertEqual(self.client.process_queue(self.queue, workers=1, poll=0), 1)
+        self.assertEqual(self.queue.counts()[FAILED], 1)
+        self.assertEqual(self.queue.counts()[DONE], 1)
+
+    def test_partially_created_batch_is_not_created_again(self):
+        queue = WorkQueue(self.queue.path, max_attempts=3)
+        queue.put('create', file=descriptions_with_a_malformed_file())
+        ids = iter(range(100, 200))
+
+        def created(*args, **kwargs):
+            return response(201, content=json.dumps({'ID': next(ids)}).encode('utf-8'))
+
+        with mock.patch.object(self.client, '_request', side_effect=created) as request:
+            self.assertEqual(self.client.process_queue(queue, workers=1, poll=0), 1)
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(queue.counts()[DONE], 1)
+
+    def test_upload_is_skipped_once_the_lease_is_lost(self):
+        lease = mock.Mock(lost=False)
+
+        def create(*args, **kwargs):
+            # the lease expires while the metadata is being created
+            lease.lost = True
+            return response(201, content=b'{"ID": 12}')
+
+        with mock.patch.object(self.client, '_request', side_effect=create), \
+                mock.patch.object(self.client, 'upload_data') as upload_data:
+            self.assertEqual(self.client._create_resource(DESCRIPTION, dataset='data.zip', lease=lease), 12)
+        upload_data.assert_not_called()
+        self.assertIsNone(self.client._create_resource(DESCRIPTION, dataset='data.zip', lease=lease))
+
+
+class TestDownloadData(TestCase):
+
+    def setUp(self):
+        self.client = ELRCShareClient()
+        self.client.parse_cache = None
+        self.client.logged_in = True
+
+    def tearDown(self):
+        self.client.logged_in = False
+
+    def test_archives_that_need_seeking_are_downloaded_once(self):
+        out = _UnseekableWriter()
+        with zipfile.ZipFile(out, 'w') as archive:
+            archive.writestr('corpus.tmx', b'<tmx/>' * 1000, zipfile.ZIP_DEFLATED)
+            # written to an unseekable file, a stored member has a data descriptor and can not be extracted while
+            # streaming
+            with archive.open('readme.txt', 'w') as member:
+                member.write(b'readme')
+        data = bytes(out.data)
+        download = response(headers={'Content-Length': str(len(data))})
+        download.iter_content.return_value = iter([data[i:i + 100] for i in range(0, len(data), 100)])
+        target_dir = tempfile.mkdtemp()
+        with mock.patch.object(self.client, '_request', return_value=download) as request:
+            paths = self.client.download_data(9, progress=False, extract_to=target_dir)
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual(sorted(os.path.basename(p) for p in paths), ['corpus.tmx', 'readme.txt'])
+        with open(os.path.join(target_dir, 'readme.txt'), 'rb') as f:
+            self.assertEqual(f.read(), b'readme')
+
+
+def record(resource_id):
+    return {'id': resource_id, 'status': 'published',
+            'resourceInfo': {'identificationInfo': {'resourceName': {'en': 'Resource {}'.format(resource_id)}}}}
+
+
+class TestGetResources(TestCase):
+
+    def setUp(self):
+        self.client = ELRCShareClient()
+        self.client.parse_cache = None
+        self.client.logged_in = True
+        self.client.cache.clear()
+        self.batches = []
+        self.single = []
+        self.params = []
+
+    def tearDown(self):
+        self.client.logged_in = False
+
+    def server(self, batch_response):
+        """A fake _request: batch_response(ids) answers id__in requests, single resources are always found"""
+
+        def request(method, url, params=None, **kwargs):
+            self.params.append(params)
+            if url == API_ENDPOINT and 'id__in' not in params:
+                return response(json={'objects': [record(i) for i in (1, 2)], 'meta': {'next': None}})
+            if 'id__in' in params:
+                ids = [int(i) for i in params['id__in'].split(',')]
+                self.batches.append(ids)
+                return batch_response(ids)
+            resource_id = int(url.rstrip('/').rsplit('/', 1)[1])
+            self.single.append(resource_id)
+            return response(content=json.dumps(record(resource_id)).encode('utf-8'))
+
+        return mock.patch.object(self.client, '_request', side_effect=request)
+
+    def test_ids_are_fetched_in_batches(self):
+        with self.server(lambda ids: response(json={'objects': [record(i) for i in ids]})):
+            results = self.client.get_resources(ids=[9, 2, 5, 7, 2], batch_size=2)
+        self.assertEqual(sorted(results), [2, 5, 7, 9])
+        self.assertEqual(sorted(sorted(batch) for batch in self.batches), [[2, 5], [7, 9]])
+        self.assertEqual(self.single, [])
+        self.assertTrue(self.client.id_filter_supported)
+
+    def test_falls_back_to_single_requests_when_the_filter_is_ignored(self):
+        with self.server(lambda ids: response(json={'objects': [record(i) for i in range(100, 110)]})):
+            results = self.client.get_resources(ids=[1, 2, 3], batch_size=2)
+        self.assertEqual(sorted(results), [1, 2, 3])
+        self.assertEqual(sorted(self.single), [1, 2, 3])
+        self.assertFalse(self.client.id_filter_supported)
+
+    def test_falls_back_to_single_requests_on_bad_request(self):
+        with self.server(lambda ids: response(400)):
+            results = self.client.get_resources(ids=[1, 2], batch_size=1)
+        self.assertEqual(sorted(results), [1, 2])
+        self.assertFalse(self.client.id_filter_supported)
+
+    def test_failed_batches_do_not_drop_the_others(self):
+        def batch_response(ids):
+            if sorted(ids) == [2, 5]:
+                return response(500)
+            return response(json={'objects': [record(i) for i in ids]})
+
+        with self.server(batch_response):
+            results = self.client.get_resources(ids=[2, 5, 7, 9], batch_size=2)
+        self.assertEqual(sorted(results), [2, 5, 7, 9])
+        self.assertEqual(sorted(self.single), [2, 5])
+        self.assertTrue(self.client.id_filter_supported)
+
+    def test_ids_left_out_of_a_capped_batch_are_fetched_one_by_one(self):
+        # the server returns at most 2 records per request, whatever the limit
+        with self.server(lambda ids: response(json={'objects': [record(i) for i in sorted(ids)[:2]],
+                                                    'meta': {'total_count': len(ids)}})):
+            results = self.client.get_resources(ids=[1, 2, 3, 4], batch_size=4)
+        self.assertEqual(sorted(results), [1, 2, 3, 4])
+        self.assertEqual(sorted(self.single), [3, 4])
+
+    def test_projected_records_keep_their_id(self):
+        with self.server(lambda ids: response(json={'objects': [record(i) for i in ids]})):
+            listed = self.client.get_resources(fields=['status'])
+            fetched = self.client.get_resources(ids=[3, 4], fields=['status'])
+        self.assertEqual(listed, {1: {'id': 1, 'status': 'published'}, 2: {'id': 2, 'status': 'published'}})
+        self.assertEqual(fetched, {3: {'id': 3, 'status': 'published'}, 4: {'id': 4, 'status': 'published'}})
+        self.assertTrue(all(params['fields'] == 'id,status' for params in self.params))
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def descriptions_with_a_malformed_file(count=3):
+    """A directory with `count` valid descriptions and a truncated one"""
+    directory = tempfile.mkdtemp()
+    with open(os.path.join(FIXTURES, 'test_create.xml'), encoding='utf-8') as f:
+        xml = f.read()
+    for i in range(count):
+        with open(os.path.join(directory, 'resource{}.xml'.format(i)), 'w', encoding='utf-8') as out:
+            out.write(xml)
+    with open(os.path.join(directory, 'truncated.xml'), 'w', encoding='utf-8') as out:
+        out.write(xml[:len(xml) // 2])
+    return directory
+
+
+class TestCreate(TestCase):
+
+    def setUp(self):
+        self.client = ELRCShareClient()
+        self.client.parse_cache = None
+        self.client.logged_in = True
+        self.ids = iter(range(100, 200))
+
+    def tearDown(self):
+        self.client.logged_in = False
+
+    def created(self, *args, **kwargs):
+        return response(201, content=json.dumps({'ID': next(self.ids)}).encode('utf-8'))
+
+    def test_failed_files_do_not_stop_a_batch(self):
+        directory = descriptions_with_a_malformed_file()
+        with mock.patch.object(self.client, '_request', side_effect=self.created) as request:
+            ids = self.client.create(directory)
+        self.assertEqual(len(ids), 4)
+        # results are in directory listing order
+        self.assertIsNone(ids[os.listdir(directory).index('truncated.xml')])
+        self.assertEqual(sorted(i for i in ids if i is not None), [100, 101, 102])
+        self.assertEqual(request.call_count, 3)
+
+    def test_validation_needs_a_local_schema(self):
+        with mock.patch('elrc_client.utils.util.XML_SCHEMA_FILE', None), \
+                mock.patch.object(self.client, '_request', side_effect=self.created) as request, \
+                self.assertLogs(level='ERROR') as logs:
+            self.assertIsNone(self.client.create(os.path.join(FIXTURES, 'test_create.xml'), validate=True))
+        request.assert_not_called()
+        self.assertIn('XML_SCHEMA_FILE', logs.output[0])
+
+    def test_descriptions_are_validated_against_the_local_schema(self):
+        schema_file = os.path.join(tempfile.mkdtemp(), 'schema.xsd')
+        with open(schema_file, 'w', encoding='utf-8') as f:
+            f.write(SCHEMA)
+        with mock.patch('elrc_client.utils.util.XML_SCHEMA_FILE', schema_file), \
+                mock.patch.object(self.client, '_request', side_effect=self.created):
+            ids = self.client.create(descriptions_with_a_malformed_file(), validate=True)
+        self.assertEqual(sorted(i for i in ids if i is not None), [100, 101, 102])
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,219 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase, main
+
+from lxml import etree
+
+from elrc_client.utils import synthetic
+from elrc_client.utils.xml import parser
+from elrc_client.utils.xml.cache import MARKER, ParseCache
+from elrc_client.utils.xml.validation import load_schema, validate_and_parse
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+class TestIterParse(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with open(os.path.join(FIXTURES, 'test_create.xml'), encoding='utf-8') as f:
+            cls.xml = f.read()
+        cls.bulk = '<?xml version="1.0" encoding="utf-8"?><resources>{}</resources>'.format(
+            cls.xml.split('?>', 1)[1] * 3)
+
+    def test_yields_each_resource_like_parse(self):
+        expected = parser.parse(self.xml)
+        items = list(parser.iterparse(io.BytesIO(self.bulk.encode('utf-8')), chunk_size=512))
+        self.assertEqual(len(items), 3)
+        for item in items:
+            self.assertEqual(item, expected)
+
+    def test_accepts_text_streams_and_strings(self):
+        self.assertEqual(len(list(parser.iterparse(io.StringIO(self.bulk), chunk_size=100))), 3)
+        self.assertEqual(len(list(parser.iterparse(self.bulk))), 3)
+
+    def test_yields_before_document_ends(self):
+        items = parser.iterparse(io.StringIO(self.bulk + '<broken'), chunk_size=512)
+        self.assertIn('resourceInfo', next(items))
+
+
+class TestParseCache(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file = os.path.join(FIXTURES, 'test_create.xml')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_second_parse_is_served_from_cache(self):
+        cache = ParseCache(self.directory)
+        first = cache.parse_file(self.file)
+        second = ParseCache(self.directory).parse_file(self.file)
+        self.assertEqual(first, second)
+        with open(self.file, 'rb') as f:
+            self.assertEqual(first, parser.parse(f.read()))
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+        cache.parse_file(self.file)
+        self.assertEqual(cache.hits, 1)
+
+    def test_changed_content_is_parsed_again(self):
+        cache = ParseCache(self.directory)
+        cache.parse('<resourceInfo><a>1</a></resourceInfo>')
+        self.assertEqual(cache.parse('<resourceInfo><a>2</a></resourceInfo>'), {'resourceInfo': {'a': '2'}})
+        self.assertEqual(cache.misses, 2)
+
+    def _other_version(self, name, last_opened):
+        path = os.path.join(self.directory, name)
+        os.makedirs(path)
+        with open(os.path.join(path, MARKER), 'w'):
+            pass
+        os.utime(os.path.join(path, MARKER), (last_opened, last_opened))
+        return path
+
+    def test_entries_of_stale_parser_versions_are_dropped(self):
+        stale = self._other_version('0123456789abcdef', time.time() - 3600)
+        recent = self._other_version('fedcba9876543210', time.time())
+        ParseCache(self.directory, stale_after=60)
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(recent))
+
+    def test_other_directories_are_kept(self):
+        unrelated = os.path.join(self.directory, 'photos')
+        unmarked = os.path.join(self.directory, '0123456789abcdef')
+        os.makedirs(unrelated)
+        os.makedirs(unmarked)
+        ParseCache(self.directory, stale_after=0)
+        self.assertTrue(os.path.isdir(unrelated))
+        self.assertTrue(os.path.isdir(unmarked))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ParseCache(self.directory, max_bytes=1500)
+        for i in range(20):
+            cache.parse('<resourceInfo><a>{}</a></resourceInfo>'.format(i))
+        self.assertLessEqual(cache._size, 1500)
+        self.assertLess(len(os.listdir(cache.directory)), 20)
+
+
+class TestLeanParse(TestCase):
+
+    def descriptions(self):
+        for name in ('test_create.xml', 'test_update.xml'):
+            with open(os.path.join(FIXTURES, name), 'rb') as f:
+                yield f.read()
+        yield synthetic.description(1, languages=(5, 5), distributions=(2, 2), relations=(3, 3))
+
+    def test_lean_output_serializes_like_default_output(self):
+        for xml in self.descriptions():
+            expected = json.dumps(parser.parse(xml), ensure_ascii=False)
+            self.assertEqual(json.dumps(parser.parse(xml, lean=True), ensure_ascii=False), expected)
+            self.assertEqual(json.dumps(parser.parse(xml, lean=True, freeze_lists=True), ensure_ascii=False),
+                             expected)
+
+    def test_lean_output_uses_plain_dicts_and_tuples(self):
+        description = parser.parse(next(self.descriptions()), lean=True, freeze_lists=True)
+        self.assertIs(type(description), dict)
+        self.assertIs(type(description['resourceInfo']['distributionInfo']), tuple)
+
+    def test_lean_iterparse(self):
+        xml = next(self.descriptions())
+        items = list(parser.iterparse(xml, item_depth=1, lean=True, freeze_lists=True))
+        self.assertEqual(len(items), 1)
+        self.assertEqual(json.dumps(items[0]), json.dumps(parser.parse(xml)))
+
+
+# accepts any resourceInfo element of the ELRC-SHARE namespace
+SCHEMA = """<?xml version="1.0" encoding="utf-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema" elementFormDefault="qualified"
+           targetNamespace="http://www.elrc-share.eu/ELRC-SHARE_SCHEMA/v2.0/">
+  <xs:element name="resourceInfo">
+    <xs:complexType>
+      <xs:sequence>
+        <xs:any processContents="skip" minOccurs="0" maxOccurs="unbounded"/>
+      </xs:sequence>
+      <xs:anyAttribute processContents="skip"/>
+    </xs:complexType>
+  </xs:element>
+</xs:schema>
+"""
+
+
+class TestValidateAndParse(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.schema_dir = tempfile.mkdtemp()
+        cls.schema_file = os.path.join(cls.schema_dir, 'schema.xsd')
+        with open(cls.schema_file, 'w', encoding='utf-8') as f:
+            f.write(SCHEMA)
+        cls.schema = load_schema(cls.schema_file)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.schema_dir)
+
+    def test_schema_is_compiled_once(self):
+        self.assertIs(load_schema(self.schema_file), self.schema)
+
+    def test_schemas_are_not_loaded_over_https(self):
+        with self.assertRaisesRegex(IOError, 'local copy'):
+            load_schema('https://elrc-share.eu/ELRC-SHARE_SCHEMA/v2.0/ELRC-SHARE-Resource.xsd')
+
+    def test_same_output_as_parse(self):
+        for name in ('test_create.xml', 'test_update.xml'):
+            path = os.path.join(FIXTURES, name)
+            with open(path, 'rb') as f:
+                expected = parser.parse(f)
+            with open(path, 'rb') as f:
+                self.assertEqual(validate_and_parse(f, self.schema, chunk_size=256), expected)
+            with open(path, 'rb') as f:
+                self.assertEqual(json.dumps(validate_and_parse(f, self.schema, lean=True)), json.dumps(expected))
+
+    def test_invalid_documents(self):
+        with self.assertRaises(etree.XMLSyntaxError):
+            validate_and_parse(b'<resources/>', self.schema)
+        with self.assertRaises(etree.XMLSyntaxError):
+            validate_and_parse('<resourceInfo xmlns="http://www.elrc-share.eu/ELRC-SHARE_SCHEMA/v2.0/"><a>'
+                               '</resourceInfo>', self.schema)
+
+
+if __name__ == '__main__':
+    main()
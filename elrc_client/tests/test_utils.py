@@ -0,0 +1,638 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import csv
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, main, mock, skipUnless
+
+from lxml import etree
+
+from elrc_client.utils.cache import ResourceCache
+from elrc_client.utils.concurrency import AdaptiveLimiter, backoff_delay, parse_retry_after
+from elrc_client.utils import export, pipeline
+from elrc_client.utils import profiling
+from elrc_client.utils.listing import LISTING_FIELDS, ResourceListing, ResourceRecord, project, summarize
+from elrc_client.utils import synthetic, zipstream
+from elrc_client.utils.search import MetadataIndex
+from elrc_client.utils.zipstream import extract, extract_stream, extract_spooled, StreamingNotSupported
+from elrc_client.utils.workqueue import WorkQueue, Heartbeat, DONE, FAILED
+from elrc_client.utils.xml import parser
+from elrc_client.utils.xml.validation import load_schema, validate_and_parse
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+class TestAdaptiveLimiter(TestCase):
+
+    def test_limit_grows_while_latency_is_flat(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=4)
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release(latency=0.1)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_limit_holds_when_latency_rises(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=8)
+        limiter.acquire()
+        limiter.release(latency=0.1)
+        limit = limiter.limit
+        for _ in range(10):
+            limiter.acquire()
+            limiter.release(latency=1.0)
+        self.assertEqual(limiter.limit, limit)
+
+    def test_limit_backs_off_on_overload(self):
+        limiter = AdaptiveLimiter(initial=8, max_limit=8)
+        limiter.acquire()
+        limiter.release(overloaded=True)
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_limit_never_drops_below_minimum(self):
+        limiter = AdaptiveLimiter(initial=2, min_limit=2, max_limit=8)
+        limiter.acquire()
+        limiter.release(overloaded=True)
+        self.assertEqual(limiter.limit, 2)
+
+    def test_retry_after_blocks_new_requests(self):
+        limiter = AdaptiveLimiter()
+        limiter.acquire()
+        limiter.release(overloaded=True, retry_after=0.2)
+        start = time.time()
+        limiter.acquire()
+        self.assertGreaterEqual(time.time() - start, 0.15)
+        limiter.release()
+
+    def test_waiters_are_counted_in_queue_depth(self):
+        limiter = AdaptiveLimiter(initial=1, max_limit=1)
+        limiter.acquire()
+        waiter = threading.Thread(target=limiter.acquire)
+        waiter.start()
+        for _ in range(100):
+            if limiter.queue_depth == 1:
+                break
+            time.sleep(0.01)
+        self.assertEqual(limiter.queue_depth, 1)
+        limiter.release()
+        waiter.join(1)
+        self.assertEqual(limiter.queue_depth, 0)
+        self.assertEqual(limiter.in_flight, 1)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after('5'), 5.0)
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertEqual(parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT'), 0.0)
+
+    def test_backoff_delay_grows_exponentially_up_to_cap(self):
+        for attempt, bound in ((0, 0.5), (1, 1.0), (3, 4.0), (10, 30.0)):
+            delays = [backoff_delay(attempt, base=0.5, cap=30.0) for _ in range(50)]
+            self.assertTrue(all(0 <= delay <= bound for delay in delays))
+            self.assertGreater(len(set(delays)), 1)
+
+
+class TestResourceListing(TestCase):
+
+    def setUp(self):
+        self.listing = ResourceListing([(30, 'Corpus C', 'published'), (10, 'Κείμενα', 'internal'),
+                                        (20, 'Corpus B', 'published')])
+
+    def test_iterates_in_id_order(self):
+        self.assertEqual([r.id for r in self.listing], [10, 20, 30])
+        self.assertEqual(list(self.listing.ids), [10, 20, 30])
+
+    def test_lookup_by_id(self):
+        self.assertEqual(self.listing.get(10), ResourceRecord(10, 'Κείμενα', 'internal'))
+        self.assertIsNone(self.listing.get(15))
+        self.assertIn(30, self.listing)
+        self.assertNotIn(31, self.listing)
+
+    def test_statuses_are_stored_once(self):
+        self.assertEqual(self.listing.statuses, ['published', 'internal'])
+        self.assertEqual([r.id for r in self.listing.with_status('published')], [20, 30])
+
+    def test_to_tsv(self):
+        self.assertEqual(self.listing.to_tsv().splitlines()[0], '10\tΚείμενα\tinternal')
+
+    def test_summarize(self):
+        record = {'id': '5', 'status': 'published',
+                  'resourceInfo': {'identificationInfo': {'resourceName': {'el': 'Όνομα', 'en': 'Name'}}}}
+        self.assertEqual(summarize(record), ResourceRecord(5, 'Name', 'published'))
+
+    def test_project(self):
+        record = {'id': '5', 'status': 'published', 'resource_uri': '/lr/5/',
+                  'resourceInfo': {'identificationInfo': {'resourceName': {'en': 'Name'}, 'description': {}},
+                                   'languageInfo': [{'languageId': 'el', 'sizeInfo': []}, {'languageId': 'en'}]}}
+        self.assertEqual(project(record, LISTING_FIELDS),
+                         {'id': '5', 'status': 'published',
+                          'resourceInfo': {'identificationInfo': {'resourceName': {'en': 'Name'}}}})
+        self.assertEqual(summarize(project(record, LISTING_FIELDS)), summarize(record))
+        self.assertEqual(project(record, ['resourceInfo.languageInfo.languageId', 'missing.field']),
+                         {'id': '5', 'resourceInfo': {'languageInfo': [{'languageId': 'el'}, {'languageId': 'en'}]}})
+        self.assertEqual(project(record, ['status']), {'id': '5', 'status': 'published'})
+
+
+class TestMetadataIndex(TestCase):
+
+    def setUp(self):
+        with open(os.path.join(FIXTURES, 'test_create.xml'), encoding='utf-8') as f:
+            description = parser.parse(f.read())
+        self.index = MetadataIndex()
+        self.index.add(dict(description, id=1, status='published'))
+        self.index.add(dict(description, id=2, status='internal'))
+
+    def test_full_text_search(self):
+        self.assertEqual(self.index.search('Belgian JUSTICE'), [1, 2])
+        self.assertEqual(self.index.search('belgian cheese'), [])
+
+    def test_faceted_search(self):
+        self.assertEqual(self.index.search(language=['nl', 'fr'], status='published'), [1])
+        self.assertEqual(self.index.search(licence='openUnder-PSI', linguality='bilingual'), [1, 2])
+        self.assertEqual(self.index.search(language=['nl', 'el']), [])
+        self.assertRaises(ValueError, self.index.search, colour='red')
+
+    def test_facet_counts(self):
+        self.assertEqual(self.index.facet_counts('status'), {'published': 1, 'internal': 1})
+        self.assertEqual(self.index.facet_counts('language', ids=[2]), {'nl': 1, 'fr': 1})
+
+    def test_re_adding_a_record_replaces_it(self):
+        self.index.add({'id': 2, 'status': 'published', 'resourceInfo': {}})
+        self.assertEqual(self.index.search(status='published'), [1, 2])
+        self.assertEqual(self.index.search('belgian'), [1])
+        self.index.remove(2)
+        self.assertNotIn(2, self.index)
+        self.assertEqual(len(self.index), 1)
+
+
+class TestPipeline(TestCase):
+
+    @staticmethod
+    def fetch(resource_id):
+        time.sleep(random.random() / 100)
+        if resource_id == '13':
+            raise IOError('not found')
+        if resource_id == '14':
+            return None
+        return 'resource-{}'.format(resource_id)
+
+    def test_read_ids(self):
+        source = io.StringIO('10 11\n\n23  # comment\n# 99\n')
+        self.assertEqual(list(pipeline.read_ids(source)), ['10', '11', '23'])
+
+    def test_results_keep_input_order(self):
+        ids = [str(i) for i in range(100)]
+        results = list(pipeline.run(self.fetch, ids, workers=8))
+        self.assertEqual([r[0] for r in results], ids)
+        self.assertEqual(results[10], ('10', 'resource-10', None))
+
+    def test_failures_do_not_abort_the_batch(self):
+        results = {r[0]: r for r in pipeline.run(self.fetch, [str(i) for i in range(20)], ordered=False)}
+        self.assertEqual(len(results), 20)
+        self.assertIsInstance(results['13'][2], IOError)
+        self.assertEqual(results['14'][2], 'failed')
+
+    def test_write_results(self):
+        out, err = io.StringIO(), io.StringIO()
+        failures = pipeline.write_results(pipeline.run(self.fetch, ['12', '13', '14']), out=out, err=err)
+        self.assertEqual(failures, 2)
+        self.assertEqual(out.getvalue(), 'resource-12\n')
+        self.assertEqual(err.getvalue().splitlines()[0], '13\tnot found')
+
+
+class TestProfile(TestCase):
+
+    def test_phases_are_collected_from_all_threads(self):
+        def work():
+            with profiling.phase(profiling.IO):
+                time.sleep(0.01)
+
+        with profiling.Profile('test', cpu=False) as profile:
+            threads = [threading.Thread(target=work) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(profile.phases[profiling.IO][1], 4)
+        self.assertIsNone(profiling._active)
+
+    def test_cpu_profile_covers_worker_threads(self):
+        def profiled_worker_task():
+            return sum(i * i for i in range(10000))
+
+        with profiling.Profile('test') as profile:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                list(executor.map(lambda _: profiled_worker_task(), range(8)))
+        self.assertIn('profiled_worker_task', profile.report())
+
+    def test_phase_outside_profile_is_a_no_op(self):
+        with profiling.phase(profiling.PARSE):
+            pass
+        self.assertIsNone(profiling._active)
+
+    def test_reports_are_written(self):
+        output_dir = tempfile.mkdtemp()
+        with profiling.Profile('test', memory=True, output_dir=output_dir) as profile:
+            with profiling.phase(profiling.PARSE):
+                parser.parse('<resourceInfo><a>1</a></resourceInfo>')
+        self.assertEqual(len(profile.paths), 2)
+        with open(profile.paths[0], encoding='utf-8') as f:
+            report = f.read()
+        self.assertIn('parse', report)
+        self.assertIn('Memory: peak', report)
+
+
+class TestWorkQueue(TestCase):
+
+    def setUp(self):
+        self.queue = WorkQueue(os.path.join(tempfile.mkdtemp(), 'queue.db'), lease_seconds=0.3, max_attempts=2)
+
+    def test_items_are_leased_once(self):
+        self.queue.put('download', resource_id=1)
+        self.queue.put('download', resource_id=2)
+        first, second = self.queue.lease('a'), self.queue.lease('b')
+        self.assertEqual((first.payload, second.payload), ({'resource_id': 1}, {'resource_id': 2}))
+        self.assertIsNone(self.queue.lease('c'))
+        self.assertTrue(self.queue.complete(first, '/tmp/archive-1.zip'))
+        self.assertEqual(list(self.queue.results())[0][3], '/tmp/archive-1.zip')
+
+    def test_expired_leases_are_re_leased(self):
+        self.queue.put('upload', resource_id=1, data_file='data.zip')
+        crashed = self.queue.lease('a')
+        time.sleep(0.35)
+        item = self.queue.lease('b')
+        self.assertEqual(item.id, crashed.id)
+        self.assertFalse(self.queue.complete(crashed))
+        self.assertTrue(self.queue.complete(item))
+        self.assertEqual(self.queue.counts()[DONE], 1)
+
+    def test_heartbeat_keeps_the_lease(self):
+        self.queue.put('create', file='resource.xml')
+        item = self.queue.lease('a')
+        with Heartbeat(self.queue, item) as heartbeat:
+            time.sleep(0.5)
+            self.assertIsNone(self.queue.lease('b'))
+        self.assertFalse(heartbeat.lost)
+        self.assertTrue(self.queue.complete(item))
+
+    def test_heartbeat_errors_lose_the_lease_once_it_expires(self):
+        self.queue.put('create', file='resource.xml')
+        item = self.queue.lease('a')
+        error = sqlite3.OperationalError('database is locked')
+        with mock.patch.object(self.queue, 'heartbeat', side_effect=error) as heartbeat, \
+                Heartbeat(self.queue, item) as lease:
+            time.sleep(0.5)
+        self.assertGreater(heartbeat.call_count, 1)
+        self.assertTrue(lease.lost)
+
+    def test_failed_items_are_retried_up_to_max_attempts(self):
+        self.queue.put('create', file='resource.xml')
+        self.queue.fail(self.queue.lease(), 'error')
+        self.queue.fail(self.queue.lease(), 'error')
+        self.assertIsNone(self.queue.lease())
+        self.assertEqual(self.queue.counts()[FAILED], 1)
+
+    def test_concurrent_workers_process_each_item_once(self):
+        for i in range(50):
+            self.queue.put('download', resource_id=i)
+        processed = []
+
+        def work():
+            queue = WorkQueue(self.queue.path)
+            item = queue.lease()
+            while item is not None:
+                if queue.complete(item):
+                    processed.append(item.payload['resource_id'])
+                item = queue.lease()
+
+        threads = [threading.Thread(target=work) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(processed), list(range(50)))
+
+
+class TestSynthetic(TestCase):
+
+    def test_descriptions_have_the_requested_shape(self):
+        description = parser.parse(synthetic.description(7, languages=(4, 4), distributions=(2, 2),
+                                                         relations=(3, 3)))['resourceInfo']
+        text_info = description['resourceComponentType']['corpusInfo']['corpusMediaType']['corpusTextInfo'][0]
+        self.assertEqual(len(text_info['languageInfo']), 4)
+        self.assertTrue(all(language['sizePerLanguage'] for language in text_info['languageInfo']))
+        self.assertEqual(text_info['lingualityInfo']['lingualityType'], 'multilingual')
+        self.assertEqual(len(description['distributionInfo']), 2)
+        self.assertEqual(len(description['relationInfo']), 3)
+
+    def test_output_is_reproducible(self):
+        self.assertEqual(synthetic.description(3), synthetic.description(3))
+
+    def test_corpus_text_elements_follow_the_schema_order(self):
+        root = etree.fromstring(synthetic.description(5, languages=(2, 2)).encode('utf-8'))
+        text_info = root.find('.//{%s}corpusTextInfo' % synthetic.NAMESPACE)
+        self.assertEqual([etree.QName(child).localname for child in text_info],
+                         ['mediaType', 'lingualityInfo', 'languageInfo', 'languageInfo', 'sizeInfo',
+                          'textFormatInfo', 'characterEncodingInfo', 'domainInfo'])
+
+    @skipUnless(os.environ.get('ELRC_SHARE_SCHEMA'), 'set ELRC_SHARE_SCHEMA to a local copy of the xml schema')
+    def test_descriptions_are_valid(self):
+        schema = load_schema(os.environ['ELRC_SHARE_SCHEMA'])
+        for resource in range(20):
+            validate_and_parse(synthetic.description(resource, languages=(1, 4), distributions=(1, 2),
+                                                     relations=(0, 2)), schema)
+
+    def test_generate_writes_descriptions_with_datasets(self):
+        output_dir = tempfile.mkdtemp()
+        paths = synthetic.generate(output_dir, 3, dataset_size=10000)
+        self.assertEqual(len(paths), 3)
+        with zipfile.ZipFile(paths[0].replace('.xml', '.zip')) as archive:
+            self.assertGreaterEqual(archive.getinfo('corpus.tmx').file_size, 10000)
+
+    def test_generate_export(self):
+        path = synthetic.generate_export(os.path.join(tempfile.mkdtemp(), 'export.xml'), 5)
+        with open(path, 'rb') as f:
+            self.assertEqual(len(list(parser.iterparse(f))), 5)
+
+
+class _UnseekableWriter(io.RawIOBase):
+    """Makes ZipFile write data descriptors, as archives streamed by a server do"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.data += b
+        return len(b)
+
+
+class TestZipStream(TestCase):
+
+    members = {'corpus/en-el.tmx': b'<tmx/>' * 5000, 'corpus/readme.txt': b'readme', 'empty.tmx': b''}
+
+    @staticmethod
+    def chunks(data, size=1000):
+        for i in range(0, len(data), size):
+            yield bytes(data[i:i + size])
+
+    def archive(self, compression=zipfile.ZIP_DEFLATED, streamed=False):
+        out = _UnseekableWriter() if streamed else io.BytesIO()
+        with zipfile.ZipFile(out, 'w', compression) as archive:
+            for name, data in self.members.items():
+                if streamed:
+                    with archive.open(name, 'w') as member:
+                        member.write(data)
+                else:
+                    archive.writestr(name, data)
+        return out.data if streamed else out.getvalue()
+
+    def assertExtracted(self, target_dir, names):
+        for name in names:
+            with open(os.path.join(target_dir, name), 'rb') as f:
+                self.assertEqual(f.read(), self.members[name])
+
+    def test_extracts_deflated_and_stored_members(self):
+        for compression in (zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED):
+            target_dir = tempfile.mkdtemp()
+            paths = extract_stream(self.chunks(self.archive(compression)), target_dir)
+            self.assertEqual(len(paths), 3)
+            self.assertExtracted(target_dir, self.members)
+
+    def test_extracts_members_with_data_descriptors(self):
+        target_dir = tempfile.mkdtemp()
+        extract_stream(self.chunks(self.archive(streamed=True), 7), target_dir)
+        self.assertExtracted(target_dir, self.members)
+
+    def test_filters_members_by_glob(self):
+        target_dir = tempfile.mkdtemp()
+        paths = extract_stream(self.chunks(self.archive()), target_dir, patterns=['*.tmx'])
+        self.assertEqual(sorted(os.path.relpath(p, target_dir) for p in paths),
+                         [os.path.join('corpus', 'en-el.tmx'), 'empty.tmx'])
+
+    def test_stored_members_of_unknown_size_need_spooling(self):
+        data = self.archive(zipfile.ZIP_STORED, streamed=True)
+        self.assertRaises(StreamingNotSupported, extract_stream, self.chunks(data), tempfile.mkdtemp())
+        target_dir = tempfile.mkdtemp()
+        extract_spooled(self.chunks(data), target_dir, patterns=['*.txt'])
+        self.assertExtracted(target_dir, ['corpus/readme.txt'])
+
+    def test_falls_back_to_spooling_for_the_rest_of_the_archive(self):
+        out = _UnseekableWriter()
+        with zipfile.ZipFile(out, 'w') as archive:
+            for name, compression in (('corpus/en-el.tmx', zipfile.ZIP_DEFLATED),
+                                      ('corpus/readme.txt', zipfile.ZIP_STORED),
+                                      ('empty.tmx', zipfile.ZIP_DEFLATED)):
+                info = zipfile.ZipInfo(name)
+                info.compress_type = compression
+                with archive.open(info, 'w') as member:
+                    member.write(self.members[name])
+        self.assertRaises(StreamingNotSupported, extract_stream, self.chunks(out.data), tempfile.mkdtemp())
+        # spooled in memory, then on disk
+        for spool_size in (zipstream.SPOOL_MEMORY_SIZE, 10):
+            target_dir = tempfile.mkdtemp()
+            with mock.patch.object(zipstream, 'SPOOL_MEMORY_SIZE', spool_size):
+                paths = extract(self.chunks(out.data, 100), target_dir)
+            self.assertEqual(sorted(os.path.relpath(p, target_dir) for p in paths),
+                             sorted(os.path.join(*name.split('/')) for name in self.members))
+            self.assertExtracted(target_dir, self.members)
+
+    def test_rejects_unsafe_member_names(self):
+        out = io.BytesIO()
+        with zipfile.ZipFile(out, 'w') as archive:
+            archive.writestr('../evil.txt', b'x')
+        self.assertRaises(zipfile.BadZipFile, extract_stream, self.chunks(out.getvalue()), tempfile.mkdtemp())
+
+
+class TestResourceCache(TestCase):
+
+    def test_hits_and_misses(self):
+        cache = ResourceCache()
+        self.assertEqual(cache.get(1, lambda: b'one'), b'one')
+        self.assertEqual(cache.get(1, lambda: b'other'), b'one')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_peek(self):
+        cache = ResourceCache()
+        self.assertIsNone(cache.peek(1))
+        cache.put(1, b'one')
+        self.assertEqual(cache.peek(1), b'one')
+        self.assertEqual(cache.misses, 0)
+
+    def test_failed_fetches_are_not_cached(self):
+        cache = ResourceCache()
+        self.assertIsNone(cache.get(1, lambda: None))
+        self.assertEqual(cache.get(1, lambda: b'one'), b'one')
+
+    def test_concurrent_fetches_are_coalesced(self):
+        cache = ResourceCache()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.1)
+            return b'one'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get(1, fetch))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [b'one'] * 8)
+        self.assertEqual(cache.stats()['coalesced'], 7)
+
+    def test_errors_are_shared_with_waiting_callers(self):
+        cache = ResourceCache()
+
+        def fetch():
+            time.sleep(0.1)
+            raise IOError('timeout')
+
+        errors = []
+
+        def get():
+            try:
+                cache.get(1, fetch)
+            except IOError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=get) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 3)
+
+    def test_entries_expire(self):
+        cache = ResourceCache(ttl=0.05)
+        cache.get(1, lambda: b'one')
+        time.sleep(0.1)
+        self.assertEqual(cache.get(1, lambda: b'new'), b'new')
+        self.assertEqual(cache.expirations, 1)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResourceCache(max_bytes=10)
+        cache.get(1, lambda: b'1234')
+        cache.get(2, lambda: b'1234')
+        cache.get(1, lambda: None)
+        cache.get(3, lambda: b'1234')
+        self.assertEqual(cache.stats()['bytes'], 8)
+        self.assertEqual(cache.get(1, lambda: None), b'1234')
+        self.assertIsNone(cache.get(2, lambda: None))
+
+    def test_invalidation_discards_fetches_in_progress(self):
+        cache = ResourceCache()
+        cache.get(1, lambda: b'old')
+        cache.invalidate(1)
+
+        def fetch():
+            cache.invalidate(1)
+            return b'stale'
+
+        self.assertEqual(cache.get(1, fetch), b'stale')
+        self.assertEqual(cache.get(1, lambda: b'new'), b'new')
+
+
+class TestExport(TestCase):
+
+    def setUp(self):
+        with open(os.path.join(FIXTURES, 'test_create.xml'), encoding='utf-8') as f:
+            self.record = dict(parser.parse(f.read()), id=7, status='published')
+
+    def test_rows(self):
+        tables = export.rows(self.record)
+        resource = tables['resources'][0]
+        self.assertEqual(resource['id'], 7)
+        self.assertEqual(resource['identificationInfo.resourceName.en'],
+                         'Belgian parallel corpus about Belgium and the justice system')
+        self.assertNotIn('distributionInfo.licenceInfo.licence', resource)
+        self.assertEqual(resource['contactPerson.communicationInfo.email'], 'ayla.rigoutsterryn@ugent.be')
+        self.assertEqual([r['languageId'] for r in tables['languages']], ['nl', 'fr'])
+        self.assertEqual(tables['sizes'], [{'resource_id': 7, 'languageId': None, 'size': '6198',
+                                            'sizeUnit': 'translationUnits'}])
+        self.assertEqual(tables['distributions'][0]['PSI'], 'true')
+        self.assertEqual(tables['licences'][0]['licence'], 'openUnder-PSI')
+        self.assertEqual(tables['licences'][0]['distribution'], 0)
+
+    def test_repeated_elements_are_joined(self):
+        row = export.flatten({'a': [{'b': 'x'}, {'b': 'y'}], 'c': True})
+        self.assertEqual(row, {'a.b': 'x|y', 'c': 'true'})
+
+    def test_export_writes_part_files(self):
+        output_dir = tempfile.mkdtemp()
+        records = [dict(self.record, id=i) for i in range(5)]
+        paths = export.export(records, output_dir, chunk_size=2)
+        self.assertEqual(len(paths['resources']), 3)
+        with open(paths['languages'][0], encoding='utf-8') as f:
+            languages = list(csv.DictReader(f))
+        self.assertEqual(languages[0]['languageName'], 'Dutch; Flemish')
+        self.assertEqual(len(paths['languages']), 5)
+
+    def test_part_files_share_the_columns_of_the_table(self):
+        output_dir = tempfile.mkdtemp()
+        records = [{'id': 1, 'status': 'published', 'resourceInfo': {'identificationInfo': {'resourceName': 'A'}}},
+                   {'id': 2, 'resourceInfo': {'versionInfo': {'version': '2.0'}}}]
+        paths = export.export(records, output_dir, chunk_size=1)
+        headers = []
+        for path in paths['resources']:
+            with open(path, encoding='utf-8') as f:
+                headers.append(next(csv.reader(f)))
+        self.assertEqual(headers[0], ['id', 'status', 'identificationInfo.resourceName', 'versionInfo.version'])
+        self.assertEqual(headers[0], headers[1])
+
+    def test_part_files_of_a_previous_export_are_removed(self):
+        output_dir = tempfile.mkdtemp()
+        records = [dict(self.record, id=i) for i in range(5)]
+        export.export(records, output_dir, chunk_size=1)
+        with open(os.path.join(output_dir, 'resources', 'notes.txt'), 'w') as f:
+            f.write('kept')
+        paths = export.export(records[:2], output_dir, chunk_size=1)
+        self.assertEqual(sorted(os.listdir(os.path.join(output_dir, 'resources'))),
+                         ['notes.txt', 'part-00000.csv', 'part-00001.csv'])
+        self.assertEqual(len(paths['resources']), 2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Flight(object):
+    """A fetch in progress, shared by all the callers asking for the same key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResourceCache(object):
+    """
+    Thread-safe in-memory cache of fetched resources (as response bytes), with per-entry time to live and
+    least recently used eviction once the cached bytes exceed `max_bytes`.
+
+    Concurrent `get` calls for a key that is not cached are coalesced: only the first caller runs the loader,
+    the others wait for its result (single-flight).
+    """
+
+    def __init__(self, ttl=300, max_bytes=64 * 1024 * 1024):
+        """
+        :param ttl: Seconds an entry stays valid
+        :param max_bytes: Maximum total size of the cached values
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, loader):
+        """
+        Get the value of a key, calling `loader()` to fetch it if it is not cached.
+        Values are bytes; a None value (failed fetch) is returned but not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._discard(key)
+                self.expirations += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                # an invalidation during the fetch removes the flight, and its result is not cached
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                    if flight.value is not None and flight.error is None:
+                        self._store(key, flight.value)
+            flight.done.set()
+        return flight.value
+
+    def peek(self, key):
+        """Get the value of a key if it is cached, without fetching it otherwise"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        """Cache a value fetched by other means (e.g. as part of a batch)"""
+        with self._lock:
+            self._store(key, value)
+
+    def _store(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        self._discard(key)
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._size += len(value)
+        while self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def invalidate(self, key):
+        """Drop a key, including the result of a fetch of it that is still in progress"""
+        with self._lock:
+            self._discard(key)
+            self._flights.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._flights.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_ratio': (self.hits + self.coalesced) / float(lookups) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self._entries),
+                'bytes': self._size
+            }
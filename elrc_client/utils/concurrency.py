@@ -0,0 +1,164 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Responses that signal an overloaded server
+OVERLOAD_STATUS_CODES = (429, 503)
+
+
+def parse_retry_after(value):
+    """
+    Convert the value of a Retry-After header to a number of seconds.
+    :param value: The header value, either delta-seconds or an HTTP date
+    :return: Seconds to wait (>= 0), or None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """
+    Delay before retrying a request that the server rejected without a Retry-After header: exponential backoff
+    with full jitter, so that clients rejected together do not retry together.
+    :param attempt: Number of the failed attempt, starting at 0
+    :param base: Upper bound of the first delay, in seconds
+    :param cap: Upper bound of any delay, in seconds
+    :return: Seconds to wait
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class AdaptiveLimiter(object):
+    """
+    AIMD concurrency limiter for requests to the ELRC-SHARE server.
+
+    The limit grows additively (about +1 per limit's worth of completed requests) while request latency stays
+    within `tolerance` times the lowest observed latency, and is cut multiplicatively by `backoff` when the server
+    answers 429/503 or a request times out. A Retry-After delay blocks new requests until it has elapsed.
+    """
+
+    def __init__(self, initial=4, min_limit=1, max_limit=16, backoff=0.5, tolerance=2.0):
+        if not 1 <= min_limit <= initial <= max_limit:
+            raise ValueError('Expected 1 <= min_limit <= initial <= max_limit')
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._waiting = 0
+        self._min_latency = None
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self):
+        """Current number of requests allowed in flight"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    @property
+    def queue_depth(self):
+        """Number of callers waiting for a free slot"""
+        return self._waiting
+
+    def stats(self):
+        with self._cond:
+            return {
+                'limit': int(self._limit),
+                'in_flight': self._in_flight,
+                'queue_depth': self._waiting,
+                'min_latency': self._min_latency,
+                'blocked_for': max(0.0, self._blocked_until - time.time())
+            }
+
+    def acquire(self):
+        """
+        Block until a request slot is free and no Retry-After delay is pending.
+        """
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    delay = self._blocked_until - time.time()
+                    if delay > 0:
+                        self._cond.wait(delay)
+                    elif self._in_flight >= int(self._limit):
+                        self._cond.wait()
+                    else:
+                        break
+            finally:
+                self._waiting -= 1
+            self._in_flight += 1
+
+    def release(self, latency=None, overloaded=False, retry_after=None):
+        """
+        Free a request slot and adjust the limit based on the outcome of the request.
+        :param latency: Duration of the request in seconds, or None if it should not count as a latency sample
+        :param overloaded: True if the server answered 429/503 or the request timed out
+        :param retry_after: Seconds the server asked us to wait before sending new requests
+        """
+        with self._cond:
+            self._in_flight -= 1
+            now = time.time()
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+            if overloaded:
+                # Decrease at most once per latency window, so a burst of rejections
+                # from the same overload episode does not collapse the limit to min_limit
+                if now - self._last_decrease >= (self._min_latency or 0.0):
+                    self._limit = max(self.min_limit, self._limit * self.backoff)
+                    self._last_decrease = now
+            elif latency is not None:
+                if self._min_latency is None or latency < self._min_latency:
+                    self._min_latency = latency
+                if latency <= self._min_latency * self.tolerance:
+                    self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            self._cond.notify_all()
@@ -37,6 +37,8 @@ from copy import copy
 from deepdiff import DeepDiff
 from functools import reduce
 
+from elrc_client.utils.profiling import phase, MERGE
+
 
 def _get_from_dict(data_dict, map_list):
     return reduce(operator.getitem, map_list, data_dict)
@@ -47,6 +49,11 @@ def _set_in_dict(data_dict, map_list, value):
 
 
 def get_update_with_ids(remote, local):
+    with phase(MERGE):
+        return _get_update_with_ids(remote, local)
+
+
+def _get_update_with_ids(remote, local):
     result = copy(local)
     diff = DeepDiff(local, remote)
 
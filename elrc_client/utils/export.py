@@ -0,0 +1,247 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Export resource metadata as flat tables for analytics:
+
+- resources: one row per resource (id, status and the flattened resourceInfo, without the elements below)
+- languages: one row per languageInfo
+- sizes: one row per sizeInfo and sizePerLanguage (with the languageId of the latter)
+- distributions: one row per distributionInfo
+- licences: one row per licenceInfo, with the position of its distributionInfo
+
+Columns are the dotted paths of the elements in the parsed description (e.g. identificationInfo.resourceName.en);
+repeated elements that are not exported as a table of their own are joined with '|'. Each table is written as
+numbered part files of `chunk_size` rows, all with the same columns: rows are spooled to a temporary file while
+the columns of the table are collected, so exports of any size are streamed:
+
+    python -m elrc_client.utils.export resources.json /path/to/output --format csv --format parquet
+"""
+
+import argparse
+import csv
+import json
+import re
+import tempfile
+
+import os
+
+from elrc_client.utils.search import find
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+TABLES = ('resources', 'languages', 'sizes', 'distributions', 'licences')
+# elements exported as tables of their own
+_TABLE_ELEMENTS = ('languageInfo', 'sizeInfo', 'sizePerLanguage', 'distributionInfo', 'licenceInfo')
+SEPARATOR = '|'
+# columns placed first, in this order, when a table has them
+LEADING_COLUMNS = ('id', 'resource_id', 'distribution', 'languageId', 'status')
+PART_FILE = re.compile(r'^part-\d{5}\.(csv|parquet)$')
+
+
+def _value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def flatten(tree, prefix='', skip=_TABLE_ELEMENTS, row=None):
+    """
+    Flatten a parsed description (or part of it) into a dictionary of dotted path -> value.
+    :param skip: Element names left out of the result
+    """
+    row = {} if row is None else row
+    if isinstance(tree, dict):
+        for key, value in tree.items():
+            if key not in skip:
+                flatten(value, '{}.{}'.format(prefix, key) if prefix else key, skip, row)
+    elif isinstance(tree, (list, tuple)):
+        for value in tree:
+            flatten(value, prefix, skip, row)
+    elif tree is not None:
+        value = _value(tree)
+        row[prefix] = '{}{}{}'.format(row[prefix], SEPARATOR, value) if prefix in row else value
+    return row
+
+
+def _elements(tree, key):
+    for value in find(tree, key):
+        for element in (value if isinstance(value, (list, tuple)) else [value]):
+            if isinstance(element, dict):
+                yield element
+
+
+def _without(tree, key):
+    """A copy of `tree` without the subtrees under `key`"""
+    if isinstance(tree, dict):
+        return dict((k, _without(v, key)) for k, v in tree.items() if k != key)
+    if isinstance(tree, (list, tuple)):
+        return [_without(v, key) for v in tree]
+    return tree
+
+
+def rows(record):
+    """
+    Split a resource record into the rows of the export tables.
+    :param record: A resource record ({'id': ..., 'status': ..., 'resourceInfo': {...}}) or a parsed description
+    :return: A dictionary of table name -> list of rows
+    """
+    info = record.get('resourceInfo', {})
+    resource_id = record.get('id')
+    resource = {'id': resource_id, 'status': record.get('status')}
+    flatten(info, row=resource)
+    tables = {'resources': [resource], 'languages': [], 'sizes': [], 'distributions': [], 'licences': []}
+    for language in _elements(info, 'languageInfo'):
+        tables['languages'].append(flatten(language, row={'resource_id': resource_id}))
+        for size in _elements(language, 'sizePerLanguage'):
+            tables['sizes'].append(flatten(size, row={'resource_id': resource_id,
+                                                      'languageId': language.get('languageId')}))
+    for size in _elements(_without(info, 'languageInfo'), 'sizeInfo'):
+        tables['sizes'].append(flatten(size, row={'resource_id': resource_id, 'languageId': None}))
+    for position, distribution in enumerate(_elements(info, 'distributionInfo')):
+        tables['distributions'].append(flatten(distribution, row={'resource_id': resource_id,
+                                                                  'distribution': position}))
+        for licence in _elements(distribution, 'licenceInfo'):
+            tables['licences'].append(flatten(licence, row={'resource_id': resource_id, 'distribution': position}))
+    return tables
+
+
+class _TableWriter(object):
+
+    def __init__(self, output_dir, table, formats, chunk_size):
+        self.directory = os.path.join(output_dir, table)
+        self.formats = formats
+        self.chunk_size = chunk_size
+        self.columns = set()
+        self.parts = 0
+        self.paths = []
+        self._spool = tempfile.TemporaryFile('w+', encoding='utf-8')
+
+    def add(self, rows):
+        for row in rows:
+            self.columns.update(row)
+            self._spool.write(json.dumps(row, ensure_ascii=False))
+            self._spool.write('\n')
+
+    def close(self):
+        """Write the spooled rows as part files with the columns of all the rows"""
+        # part files of a previous export of the table would be read along with the new ones
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if PART_FILE.match(name):
+                    os.remove(os.path.join(self.directory, name))
+        leading = [c for c in LEADING_COLUMNS if c in self.columns]
+        columns = leading + sorted(self.columns - set(leading))
+        self._spool.seek(0)
+        chunk = []
+        for line in self._spool:
+            chunk.append(json.loads(line))
+            if len(chunk) >= self.chunk_size:
+                self._write(chunk, columns)
+                chunk = []
+        self._write(chunk, columns)
+        self._spool.close()
+
+    def _write(self, rows, columns):
+        if not rows:
+            return
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        base = os.path.join(self.directory, 'part-{:05d}'.format(self.parts))
+        if 'csv' in self.formats:
+            with open(base + '.csv', 'w', encoding='utf-8', newline='') as out:
+                writer = csv.DictWriter(out, fieldnames=columns)
+                writer.writeheader()
+                writer.writerows(rows)
+            self.paths.append(base + '.csv')
+        if 'parquet' in self.formats:
+            table = pyarrow.table(dict(
+                (c, pyarrow.array([None if row.get(c) is None else _value(row[c]) for row in rows],
+                                  type=pyarrow.string()))
+                for c in columns))
+            pyarrow.parquet.write_table(table, base + '.parquet')
+            self.paths.append(base + '.parquet')
+        self.parts += 1
+
+
+def export(records, output_dir, formats=('csv',), chunk_size=10000):
+    """
+    Stream resource records into flat tables.
+    :param records: Iterable of resource records, e.g. client.iter_resources()
+    :param output_dir: Directory where a sub-directory is created for each table
+    :param formats: 'csv' and/or 'parquet' (requires pyarrow)
+    :param chunk_size: Number of rows per part file
+    :return: A dictionary of table name -> paths of the written part files
+    """
+    formats = set(formats)
+    if 'parquet' in formats and pyarrow is None:
+        raise ImportError('Parquet export requires pyarrow (pip install pyarrow)')
+    writers = dict((table, _TableWriter(output_dir, table, formats, chunk_size)) for table in TABLES)
+    for record in records:
+        for table, table_rows in rows(record).items():
+            writers[table].add(table_rows)
+    for writer in writers.values():
+        writer.close()
+    return dict((table, writer.paths) for table, writer in writers.items())
+
+
+def load_records(path):
+    """
+    Read resource records from a json dump: a list of records, a dictionary of id -> record or a single record.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return data
+    if 'resourceInfo' in data:
+        return [data]
+    return [dict(record, id=record.get('id', resource_id)) for resource_id, record in data.items()]
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description='Export ELRC-SHARE metadata as flat tables')
+    arguments.add_argument('dump', nargs='+', help='json files with resource records')
+    arguments.add_argument('output', help='Output directory')
+    arguments.add_argument('--format', action='append', choices=['csv', 'parquet'], dest='formats')
+    arguments.add_argument('--chunk-size', type=int, default=10000)
+    args = arguments.parse_args(argv)
+    records = (record for path in args.dump for record in load_records(path))
+    export(records, args.output, formats=args.formats or ['csv'], chunk_size=args.chunk_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+
+class ResourceRecord(namedtuple('ResourceRecord', ['id', 'name', 'status'])):
+    __slots__ = ()
+
+    def __str__(self):
+        return '{}\t{}\t{}'.format(self.id, self.name, self.status)
+
+
+# Fields of a resource record needed to summarize it
+LISTING_FIELDS = ('id', 'status', 'resourceInfo.identificationInfo.resourceName')
+
+
+def project(record, fields):
+    """
+    Keep only the given fields of a resource record. The id is always kept, so that projected records can be
+    told apart.
+    :param record: A resource record, as returned by the editor API
+    :param fields: Dotted paths of the fields to keep, e.g. 'resourceInfo.identificationInfo.resourceName'
+    (paths through lists of elements apply to each element)
+    :return: A new record with the id and the selected fields
+    """
+    result = {}
+    for field in with_id(fields):
+        _copy(record, result, field.split('.'))
+    return result
+
+
+def with_id(fields):
+    """The given fields, with the id first if it is not selected"""
+    fields = list(fields)
+    return fields if 'id' in fields else ['id'] + fields
+
+
+def _copy(source, target, path):
+    key = path[0]
+    if not isinstance(source, dict) or key not in source:
+        return
+    value = source[key]
+    if len(path) == 1:
+        target[key] = value
+    elif isinstance(value, list):
+        items = target.setdefault(key, [{} for _ in value])
+        for item, projected in zip(value, items):
+            _copy(item, projected, path[1:])
+    elif isinstance(value, dict):
+        _copy(value, target.setdefault(key, {}), path[1:])
+
+
+def summarize(record):
+    """
+    Get the (id, name, status) summary of a resource record returned by the editor API.
+    The name is the english resource name, or the first available one.
+    """
+    info = record.get('resourceInfo', {})
+    names = info.get('identificationInfo', {}).get('resourceName') or {}
+    if isinstance(names, dict):
+        name = names.get('en') or next(iter(names.values()), '')
+    else:
+        name = names
+    return ResourceRecord(int(record['id']), name, record.get('status', ''))
+
+
+class ResourceListing(object):
+    """
+    Compact, id-ordered listing of resource summaries.
+
+    Instead of a dict per resource, ids are kept in an array, names are kept utf-8 encoded in a single buffer
+    and each distinct status string is stored once and referenced by a one byte code. Records are
+    materialized as ResourceRecord tuples only when they are accessed.
+    """
+
+    __slots__ = ('_ids', '_offsets', '_names', '_codes', '_statuses', '_status_codes', '_sorted')
+
+    def __init__(self, records=()):
+        self._ids = array('q')
+        self._offsets = array('Q', [0])
+        self._names = bytearray()
+        self._codes = array('B')
+        self._statuses = []
+        self._status_codes = {}
+        self._sorted = True
+        for record in records:
+            self.add(*record)
+
+    def add(self, resource_id, name, status):
+        resource_id = int(resource_id)
+        if self._ids and resource_id < self._ids[-1]:
+            self._sorted = False
+        code = self._status_codes.get(status)
+        if code is None:
+            if len(self._statuses) > 255:
+                raise ValueError('Too many distinct status values')
+            code = self._status_codes[status] = len(self._statuses)
+            self._statuses.append(status)
+        self._ids.append(resource_id)
+        self._names.extend((name or '').encode('utf-8'))
+        self._offsets.append(len(self._names))
+        self._codes.append(code)
+
+    def _sort(self):
+        if self._sorted:
+            return
+        order = sorted(range(len(self._ids)), key=self._ids.__getitem__)
+        names = bytearray()
+        offsets = array('Q', [0])
+        for i in order:
+            names.extend(self._names[self._offsets[i]:self._offsets[i + 1]])
+            offsets.append(len(names))
+        self._ids = array('q', (self._ids[i] for i in order))
+        self._codes = array('B', (self._codes[i] for i in order))
+        self._names, self._offsets = names, offsets
+        self._sorted = True
+
+    def _record(self, i):
+        name = self._names[self._offsets[i]:self._offsets[i + 1]].decode('utf-8')
+        return ResourceRecord(self._ids[i], name, self._statuses[self._codes[i]])
+
+    def _position(self, resource_id):
+        self._sort()
+        i = bisect_left(self._ids, resource_id)
+        if i < len(self._ids) and self._ids[i] == resource_id:
+            return i
+        return None
+
+    def get(self, resource_id, default=None):
+        """Get the record of a resource id, in O(log n)"""
+        i = self._position(int(resource_id))
+        return default if i is None else self._record(i)
+
+    def __contains__(self, resource_id):
+        return self._position(int(resource_id)) is not None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        """Iterate over the records in ascending id order"""
+        self._sort()
+        for i in range(len(self._ids)):
+            yield self._record(i)
+
+    @property
+    def ids(self):
+        """The resource ids in ascending order"""
+        self._sort()
+        return self._ids
+
+    @property
+    def statuses(self):
+        return list(self._statuses)
+
+    def with_status(self, status):
+        code = self._status_codes.get(status)
+        self._sort()
+        for i, c in enumerate(self._codes):
+            if c == code:
+                yield self._record(i)
+
+    def to_tsv(self):
+        return '\n'.join(str(record) for record in self)
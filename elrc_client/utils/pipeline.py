@@ -0,0 +1,116 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+def read_ids(source):
+    """
+    Read resource ids from a file object or a file path. Ids may be separated by whitespace or newlines;
+    anything after a '#' on a line is ignored.
+    :return: Generator of ids, as strings, in input order
+    """
+    if isinstance(source, str):
+        with open(source, 'r') as f:
+            for resource_id in read_ids(f):
+                yield resource_id
+        return
+    for line in source:
+        for token in line.split('#', 1)[0].split():
+            yield token
+
+
+def run(func, ids, workers=8, ordered=True):
+    """
+    Apply `func` to each id on a pool of worker threads, keeping at most a few ids per worker in flight so that
+    arbitrarily long inputs can be streamed.
+    :param func: Function of a resource id; None or an exception marks a failure
+    :param ids: Iterable of resource ids
+    :param workers: Number of worker threads
+    :param ordered: Yield results in input order (True) or as soon as they complete (False)
+    :return: Generator of (resource_id, result, error) tuples; error is None on success
+    """
+
+    def call(resource_id):
+        try:
+            result = func(resource_id)
+        except Exception as e:
+            return resource_id, None, e
+        if result is None:
+            return resource_id, None, 'failed'
+        return resource_id, result, None
+
+    window = 4 * workers
+    ids = iter(ids)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if ordered:
+            pending = deque()
+            for resource_id in ids:
+                pending.append(executor.submit(call, resource_id))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        else:
+            pending = set()
+            for resource_id in ids:
+                pending.add(executor.submit(call, resource_id))
+                if len(pending) >= window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+
+def write_results(results, out=None, err=None):
+    """
+    Write pipeline results to `out`, one result per line, and failures to `err` as tab delimited id and error.
+    :return: The number of failures
+    """
+    out = out or sys.stdout
+    err = err or sys.stderr
+    failures = 0
+    for resource_id, result, error in results:
+        if error is not None:
+            failures += 1
+            err.write('{}\t{}\n'.format(resource_id, error))
+        else:
+            out.write('{}\n'.format(result))
+            out.flush()
+    return failures
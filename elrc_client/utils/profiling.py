@@ -0,0 +1,196 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Phases reported by the profiler
+PARSE = 'parse'
+SERIALIZE = 'serialize'
+MERGE = 'merge'
+IO = 'io'
+
+# The profile currently collecting phase timings, shared by all threads
+_active = None
+
+# Since python 3.12 a cProfile profiler covers all threads; before, it only covers the thread that enabled it
+PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+@contextmanager
+def phase(name):
+    """
+    Account the time spent in the enclosed block to a phase (parse, serialize, merge or io) of the active profile.
+    Does nothing if no profile is active.
+    """
+    profile = _active
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
+
+
+class Profile(object):
+    """
+    Context manager that profiles the enclosed block.
+
+    Time spent in the parse, serialize, merge and io phases, the cProfile CPU profile and the allocation
+    snapshots (tracemalloc) cover all threads, including the worker threads started within the block (e.g. by
+    ThreadPoolExecutor); threads started before the block are only covered by the phase timings.
+
+        with Profile('import', memory=True, output_dir='.') as p:
+            client.create('path/to/descriptions')
+        print(p.report())
+    """
+
+    def __init__(self, name='elrc', cpu=True, memory=False, output_dir=None, top=25):
+        """
+        :param name: Name used in the report file names
+        :param cpu: Collect a cProfile CPU profile
+        :param memory: Collect a tracemalloc allocation snapshot
+        :param output_dir: If given, write profile-<name>-<timestamp>.txt (and .prof for the CPU profile) here
+        :param top: Number of functions/allocation sites listed in the report
+        """
+        self.name = name
+        self.cpu = cpu
+        self.memory = memory
+        self.output_dir = output_dir
+        self.top = top
+        self.phases = {}
+        self.elapsed = None
+        self.paths = []
+        self._profiler = None
+        self._thread_profilers = []
+        self._snapshot = None
+        self._peak = None
+        self._previous = None
+        self._start = None
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            total, calls = self.phases.get(name, (0.0, 0))
+            self.phases[name] = (total + seconds, calls + 1)
+
+    def _profile_thread(self, *args):
+        """Called once in each thread started within the block: profile it with its own profiler"""
+        profiler = cProfile.Profile()
+        with self._lock:
+            self._thread_profilers.append(profiler)
+        # replaces this hook for the rest of the thread
+        profiler.enable()
+
+    def _stats(self, stream=None):
+        """The CPU profiles of all threads, merged"""
+        stats = pstats.Stats(self._profiler, stream=stream)
+        with self._lock:
+            profilers = list(self._thread_profilers)
+        for profiler in profilers:
+            try:
+                stats.add(profiler)
+            except TypeError:
+                # the thread ended before making any call
+                pass
+        return stats
+
+    def __enter__(self):
+        global _active
+        self._previous, _active = _active, self
+        if self.memory:
+            tracemalloc.start()
+        if self.cpu:
+            self._profiler = cProfile.Profile()
+            if not PROFILES_ALL_THREADS:
+                threading.setprofile(self._profile_thread)
+            self._profiler.enable()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        self.elapsed = time.perf_counter() - self._start
+        if self._profiler is not None:
+            self._profiler.disable()
+            if not PROFILES_ALL_THREADS:
+                threading.setprofile(None)
+        if self.memory:
+            self._snapshot = tracemalloc.take_snapshot()
+            self._peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        _active = self._previous
+        if self.output_dir:
+            self.save(self.output_dir)
+        return False
+
+    def report(self):
+        out = io.StringIO()
+        out.write('Profile: {} ({:.3f}s)\n\n'.format(self.name, self.elapsed or 0.0))
+        out.write('{:<12}{:>12}{:>10}{:>8}\n'.format('phase', 'seconds', 'calls', '%'))
+        for name, (total, calls) in sorted(self.phases.items(), key=lambda p: -p[1][0]):
+            share = 100.0 * total / self.elapsed if self.elapsed else 0.0
+            out.write('{:<12}{:>12.3f}{:>10}{:>8.1f}\n'.format(name, total, calls, share))
+        out.write('(phase times are summed over all threads)\n')
+        if self._profiler is not None:
+            out.write('\nCPU profile (all threads)\n')
+            self._stats(stream=out).sort_stats('cumulative').print_stats(self.top)
+        if self._snapshot is not None:
+            out.write('\nMemory: peak {:,.1f} KiB traced\n'.format(self._peak / 1024.0))
+            for stat in self._snapshot.statistics('lineno')[:self.top]:
+                out.write('{}\n'.format(stat))
+        return out.getvalue()
+
+    def save(self, output_dir):
+        """
+        Write the report (and the CPU profile, loadable with pstats) to output_dir.
+        :return: The paths of the written files
+        """
+        base = os.path.join(output_dir, 'profile-{}-{}'.format(self.name, time.strftime('%Y%m%d-%H%M%S')))
+        with open(base + '.txt', 'w', encoding='utf-8') as out:
+            out.write(self.report())
+        self.paths = [base + '.txt']
+        if self._profiler is not None:
+            self._stats().dump_stats(base + '.prof')
+            self.paths.append(base + '.prof')
+        return self.paths
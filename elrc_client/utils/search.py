@@ -0,0 +1,194 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import re
+import threading
+from collections import Counter
+
+# facet name: (element holding the values, element with the value)
+FACETS = {
+    'language': ('languageInfo', 'languageId'),
+    'domain': ('domainInfo', 'domain'),
+    'licence': ('licenceInfo', 'licence'),
+    'resource_type': ('resourceComponentType', 'resourceType'),
+    'linguality': ('lingualityInfo', 'lingualityType'),
+}
+TEXT_FIELDS = ('resourceName', 'description')
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return set(_TOKEN.findall(text.lower()))
+
+
+def find(tree, key):
+    """Yield every value stored under `key` anywhere in a parsed description"""
+    if isinstance(tree, dict):
+        for k, v in tree.items():
+            if k == key:
+                yield v
+            else:
+                for found in find(v, key):
+                    yield found
+    elif isinstance(tree, (list, tuple)):
+        for v in tree:
+            for found in find(v, key):
+                yield found
+
+
+def _leaves(value):
+    """Flatten lists and language maps ({'en': ..., 'el': ...}) into their string values"""
+    if isinstance(value, dict):
+        for v in value.values():
+            for leaf in _leaves(v):
+                yield leaf
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            for leaf in _leaves(v):
+                yield leaf
+    elif value is not None:
+        yield str(value)
+
+
+class MetadataIndex(object):
+    """
+    In-memory inverted index over resource records, for full-text search on resource names and descriptions
+    and faceted search on status, language, domain, licence, resource type and linguality.
+
+    Records are (re)indexed with `add` as they are fetched; adding a record with a known id replaces it.
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._facets = {name: {} for name in list(FACETS) + ['status']}
+        self._documents = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def __contains__(self, resource_id):
+        return int(resource_id) in self._documents
+
+    @staticmethod
+    def _extract(record):
+        info = record.get('resourceInfo', {})
+        tokens = set()
+        for field in TEXT_FIELDS:
+            for value in find(info.get('identificationInfo', {}), field):
+                for text in _leaves(value):
+                    tokens.update(tokenize(text))
+        facets = {}
+        for name, (container, key) in FACETS.items():
+            facets[name] = set(leaf for subtree in find(info, container)
+                               for value in find(subtree, key) for leaf in _leaves(value))
+        facets['status'] = set(_leaves(record.get('status')))
+        return tokens, facets
+
+    def add(self, record):
+        """
+        Index a resource record, replacing any previous version of it.
+        :param record: A resource record, with 'id', 'status' and 'resourceInfo' keys
+        """
+        resource_id = int(record['id'])
+        tokens, facets = self._extract(record)
+        with self._lock:
+            self._remove(resource_id)
+            for token in tokens:
+                self._postings.setdefault(token, set()).add(resource_id)
+            for name, values in facets.items():
+                for value in values:
+                    self._facets[name].setdefault(value, set()).add(resource_id)
+            self._documents[resource_id] = (tokens, facets)
+
+    def remove(self, resource_id):
+        with self._lock:
+            self._remove(int(resource_id))
+
+    def _remove(self, resource_id):
+        document = self._documents.pop(resource_id, None)
+        if document is None:
+            return
+        tokens, facets = document
+        for token in tokens:
+            self._discard(self._postings, token, resource_id)
+        for name, values in facets.items():
+            for value in values:
+                self._discard(self._facets[name], value, resource_id)
+
+    @staticmethod
+    def _discard(postings, key, resource_id):
+        ids = postings[key]
+        ids.discard(resource_id)
+        if not ids:
+            del postings[key]
+
+    def search(self, text=None, **facets):
+        """
+        Find the resources matching all the given criteria.
+        :param text: Words that must all appear in the resource name or description
+        :param facets: Facet values to match, e.g. status='published', language=['en', 'el'] (all the listed
+        values must match), domain='Law'
+        :return: The sorted ids of the matching resources
+        """
+        with self._lock:
+            candidates = []
+            for token in tokenize(text or ''):
+                candidates.append(self._postings.get(token, set()))
+            for name, values in facets.items():
+                if name not in self._facets:
+                    raise ValueError('Unknown facet: {}'.format(name))
+                if isinstance(values, str):
+                    values = [values]
+                for value in values:
+                    candidates.append(self._facets[name].get(value, set()))
+            if not candidates:
+                return sorted(self._documents)
+            candidates.sort(key=len)
+            return sorted(set.intersection(*candidates))
+
+    def facet_counts(self, name, ids=None):
+        """
+        Count the resources per value of a facet.
+        :param name: The facet name (status, language, domain, licence, resource_type or linguality)
+        :param ids: Only count these resources (e.g. the result of `search`)
+        :return: A Counter of facet value -> number of resources
+        """
+        with self._lock:
+            if ids is None:
+                return Counter({value: len(matching) for value, matching in self._facets[name].items()})
+            ids = set(ids)
+            counts = Counter({value: len(matching & ids) for value, matching in self._facets[name].items()})
+            return +counts
@@ -0,0 +1,234 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+"""
+Generate synthetic ELRC-SHARE resource descriptions and datasets for scale testing.
+
+    python -m elrc_client.utils.synthetic /path/to/output --count 10000 --languages 2-6 --dataset-size 1048576
+    python -m elrc_client.utils.synthetic /path/to/export.xml --count 100000 --export
+
+Descriptions are checked against the ELRC-SHARE schema by the test suite when ELRC_SHARE_SCHEMA points to a local
+copy of ELRC-SHARE-Resource.xsd (and the files it includes).
+"""
+
+import argparse
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+import os
+
+NAMESPACE = 'http://www.elrc-share.eu/ELRC-SHARE_SCHEMA/v2.0/'
+SCHEMA_LOCATION = '{0} {0}ELRC-SHARE-Resource.xsd'.format(NAMESPACE)
+
+LANGUAGES = [
+    ('bg', 'Bulgarian', 'Cyrillic'), ('cs', 'Czech', 'Latin'), ('da', 'Danish', 'Latin'),
+    ('de', 'German', 'Latin'), ('el', 'Modern Greek (1453-)', 'Greek'), ('en', 'English', 'Latin'),
+    ('es', 'Spanish; Castilian', 'Latin'), ('et', 'Estonian', 'Latin'), ('fi', 'Finnish', 'Latin'),
+    ('fr', 'French', 'Latin'), ('ga', 'Irish', 'Latin'), ('hr', 'Croatian', 'Latin'),
+    ('hu', 'Hungarian', 'Latin'), ('it', 'Italian', 'Latin'), ('lt', 'Lithuanian', 'Latin'),
+    ('lv', 'Latvian', 'Latin'), ('mt', 'Maltese', 'Latin'), ('nl', 'Dutch; Flemish', 'Latin'),
+    ('pl', 'Polish', 'Latin'), ('pt', 'Portuguese', 'Latin'), ('ro', 'Romanian; Moldavian; Moldovan', 'Latin'),
+    ('sk', 'Slovak', 'Latin'), ('sl', 'Slovenian', 'Latin'), ('sv', 'Swedish', 'Latin'),
+]
+LICENCES = ['CC-BY-4.0', 'CC-BY-SA-4.0', 'CC0-1.0', 'openUnder-PSI', 'non-standard/Other_Licence/Terms']
+DOMAINS = ['Law', 'Health', 'Finance', 'Transport', 'Education and communications', 'Environment']
+RELATIONS = ['hasAlignedVersion', 'isAlignedVersionOf', 'hasPart', 'isPartOf', 'isRelatedTo']
+SIZE_UNITS = ['translationUnits', 'words', 'sentences']
+WORDS = ('corpus parallel translation memory public administration legal texts aligned segments documents '
+         'european commission language resource health regulation national portal monolingual bilingual '
+         'terminology collection website crawled cleaned annotated').split()
+
+
+def _text(rnd, words):
+    return ' '.join(rnd.choice(WORDS) for _ in range(words))
+
+
+def _range(value):
+    """Parse 'n' or 'min-max' into a (min, max) tuple"""
+    low, _, high = value.partition('-')
+    return int(low), int(high or low)
+
+
+def description(resource, rnd=None, languages=(2, 2), distributions=(1, 1), relations=(0, 1),
+                description_words=(20, 60)):
+    """
+    Build a synthetic corpus description.
+    :param resource: Number of the resource, used in its name
+    :param rnd: A random.Random instance (seeded per resource if not given, so output is reproducible)
+    :param languages: (min, max) number of languages, each with a sizePerLanguage entry
+    :param distributions: (min, max) number of distributionInfo entries
+    :param relations: (min, max) number of relationInfo entries
+    :param description_words: (min, max) number of words in the description
+    :return: The xml description as a string
+    """
+    rnd = rnd or random.Random(resource)
+    langs = rnd.sample(LANGUAGES, min(len(LANGUAGES), rnd.randint(*languages)))
+    linguality = {1: 'monolingual', 2: 'bilingual'}.get(len(langs), 'multilingual')
+    out = ['<?xml version="1.0" encoding="utf-8"?>\n',
+           '<resourceInfo xmlns="{}" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+           'xsi:schemaLocation="{}">'.format(NAMESPACE, SCHEMA_LOCATION),
+           '<identificationInfo>',
+           '<resourceName lang="en">Synthetic {} corpus {} ({})</resourceName>'.format(
+               linguality, resource, '-'.join(l[0].upper() for l in langs)),
+           '<description lang="en">{}</description>'.format(escape(_text(rnd, rnd.randint(*description_words)))),
+           '</identificationInfo>']
+    for _ in range(rnd.randint(*distributions)):
+        out.extend([
+            '<distributionInfo>',
+            '<availability>available</availability>',
+            '<PSI>{}</PSI>'.format(rnd.choice(['true', 'false'])),
+            '<allowsUsesBesidesDGT>true</allowsUsesBesidesDGT>',
+            '<licenceInfo><licence>{}</licence></licenceInfo>'.format(rnd.choice(LICENCES)),
+            '<attributionText lang="en">Synthetic data</attributionText>',
+            '<personalDataIncluded>false</personalDataIncluded>',
+            '<sensitiveDataIncluded>false</sensitiveDataIncluded>',
+            '</distributionInfo>'])
+    out.extend([
+        '<contactPerson>',
+        '<surname lang="en">Doe</surname>',
+        '<givenName lang="en">Jane</givenName>',
+        '<communicationInfo><email>contact{}@example.org</email></communicationInfo>'.format(resource),
+        '</contactPerson>',
+        '<metadataInfo>',
+        '<metadataCreationDate>2019-01-01</metadataCreationDate>',
+        '<metadataLanguageName>English</metadataLanguageName>',
+        '<metadataLanguageId>en</metadataLanguageId>',
+        '</metadataInfo>'])
+    for _ in range(rnd.randint(*relations)):
+        out.extend([
+            '<relationInfo>',
+            '<relationType>{}</relationType>'.format(rnd.choice(RELATIONS)),
+            '<relatedResource><targetResourceNameURI>{}</targetResourceNameURI></relatedResource>'.format(
+                rnd.randint(1, 100000)),
+            '</relationInfo>'])
+    unit = rnd.choice(SIZE_UNITS)
+    out.extend([
+        '<resourceComponentType><corpusInfo>',
+        '<resourceType>corpus</resourceType>',
+        '<corpusMediaType><corpusTextInfo>',
+        '<mediaType>text</mediaType>',
+        '<lingualityInfo><lingualityType>{}</lingualityType></lingualityInfo>'.format(linguality)])
+    for language_id, name, script in langs:
+        out.extend([
+            '<languageInfo>',
+            '<languageId>{}</languageId>'.format(language_id),
+            '<languageName>{}</languageName>'.format(escape(name)),
+            '<languageScript>{}</languageScript>'.format(script),
+            '<sizePerLanguage><size>{}</size><sizeUnit>{}</sizeUnit></sizePerLanguage>'.format(
+                rnd.randint(100, 1000000), unit),
+            '</languageInfo>'])
+    out.extend([
+        '<sizeInfo><size>{}</size><sizeUnit>{}</sizeUnit></sizeInfo>'.format(rnd.randint(100, 1000000), unit),
+        '<textFormatInfo><dataFormat>application/x-tmx+xml</dataFormat></textFormatInfo>',
+        '<characterEncodingInfo><characterEncoding>UTF-8</characterEncoding></characterEncodingInfo>',
+        '<domainInfo><domain>{}</domain></domainInfo>'.format(rnd.choice(DOMAINS)),
+        '</corpusTextInfo></corpusMediaType>',
+        '</corpusInfo></resourceComponentType>',
+        '</resourceInfo>\n'])
+    return ''.join(out)
+
+
+def dataset(path, size, rnd=None):
+    """
+    Write a zip dataset holding a synthetic TMX file of about `size` bytes (uncompressed).
+    """
+    rnd = rnd or random.Random(size)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        with archive.open('corpus.tmx', 'w') as tmx:
+            written = tmx.write(b'<?xml version="1.0" encoding="utf-8"?>\n<tmx version="1.4"><body>\n')
+            while written < size:
+                segment = escape(_text(rnd, 12))
+                written += tmx.write('<tu><tuv xml:lang="en"><seg>{0}</seg></tuv><tuv xml:lang="el"><seg>{0}'
+                                     '</seg></tuv></tu>\n'.format(segment).encode('utf-8'))
+            tmx.write(b'</body></tmx>\n')
+
+
+def generate(output_dir, count, start=1, dataset_size=0, seed=0, **kwargs):
+    """
+    Write `count` descriptions as resource-<n>.xml into output_dir, each with a resource-<n>.zip dataset if
+    dataset_size > 0 (the layout expected by batch creation).
+    :return: The paths of the written descriptions
+    """
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    paths = []
+    for resource in range(start, start + count):
+        rnd = random.Random(seed * 1000003 + resource)
+        path = os.path.join(output_dir, 'resource-{}.xml'.format(resource))
+        with open(path, 'w', encoding='utf-8') as out:
+            out.write(description(resource, rnd, **kwargs))
+        if dataset_size:
+            dataset(os.path.join(output_dir, 'resource-{}.zip'.format(resource)), dataset_size, rnd)
+        paths.append(path)
+    return paths
+
+
+def generate_export(path, count, start=1, seed=0, **kwargs):
+    """
+    Write `count` descriptions into a single bulk export file (resourceInfo elements under a <resources> root).
+    """
+    with open(path, 'w', encoding='utf-8') as out:
+        out.write('<?xml version="1.0" encoding="utf-8"?>\n<resources>\n')
+        for resource in range(start, start + count):
+            xml = description(resource, random.Random(seed * 1000003 + resource), **kwargs)
+            out.write(xml.split('?>', 1)[1])
+        out.write('</resources>\n')
+    return path
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description='Generate synthetic ELRC-SHARE descriptions and datasets')
+    arguments.add_argument('output', help='Output directory (or file, with --export)')
+    arguments.add_argument('-n', '--count', type=int, default=1000)
+    arguments.add_argument('--start', type=int, default=1, help='Number of the first resource')
+    arguments.add_argument('--seed', type=int, default=0)
+    arguments.add_argument('--languages', type=_range, default=(2, 2), help='Languages per resource (n or min-max)')
+    arguments.add_argument('--distributions', type=_range, default=(1, 1), help='distributionInfo per resource')
+    arguments.add_argument('--relations', type=_range, default=(0, 1), help='relationInfo per resource')
+    arguments.add_argument('--description-words', type=_range, default=(20, 60))
+    arguments.add_argument('--dataset-size', type=int, default=0,
+                           help='Size in bytes of the dataset written with each description (0 for none)')
+    arguments.add_argument('--export', action='store_true', help='Write a single bulk export file')
+    args = arguments.parse_args(argv)
+    options = dict(languages=args.languages, distributions=args.distributions, relations=args.relations,
+                   description_words=args.description_words)
+    if args.export:
+        generate_export(args.output, args.count, start=args.start, seed=args.seed, **options)
+    else:
+        generate(args.output, args.count, start=args.start, dataset_size=args.dataset_size, seed=args.seed,
+                 **options)
+
+
+if __name__ == '__main__':
+    main()
@@ -35,7 +35,8 @@
 import sys
 
 import os
-from elrc_client.settings import XML_SCHEMA
+from elrc_client.settings import XML_SCHEMA, XML_SCHEMA_FILE
+from elrc_client.utils.xml.validation import load_schema
 from io import StringIO
 from lxml import etree
 
@@ -70,24 +71,36 @@ def parse_xml_well_formed(xml_string):
         return False
 
 
+def description_schema():
+    """
+    Get the compiled ELRC-SHARE schema that descriptions are validated against.
+    :return: An lxml XMLSchema, loaded from XML_SCHEMA_FILE
+    :raise IOError: If XML_SCHEMA_FILE is not set or can not be read
+    """
+    if not XML_SCHEMA_FILE:
+        raise IOError('No local copy of the schema: set XML_SCHEMA_FILE in settings (or the ELRC_SHARE_SCHEMA '
+                      'environment variable) to the path of a local copy of {}'.format(XML_SCHEMA))
+    return load_schema(XML_SCHEMA_FILE)
+
+
 def validate(xml_file):
-    xml = open(xml_file, 'r', encoding='utf-8').read()
-    print(XML_SCHEMA)
-    xmlschema_doc = etree.parse(StringIO(XML_SCHEMA))
-    xmlschema = etree.XMLSchema(xmlschema_doc)
-    doc = parse_xml_well_formed(xml)
-    if doc:
-        # validate against schema
-        try:
-            xmlschema.assertValid(doc)
-            print('XML valid, schema validation ok.')
-            return True
-        except etree.DocumentInvalid as err:
-            print('Schema validation error, see error_schema.log')
-            return False
-        except:
-            print('Unknown error, exiting.')
-            return False
+    try:
+        xmlschema = description_schema()
+    except (etree.XMLSchemaParseError, etree.XMLSyntaxError, IOError) as err:
+        print('Could not load schema: {}'.format(err))
+        return False
+    # parse and validate in a single pass, reading the file incrementally
+    try:
+        with open(xml_file, 'rb') as inp:
+            etree.parse(inp, etree.XMLParser(schema=xmlschema, resolve_entities=False))
+        print('XML valid, schema validation ok.')
+        return True
+    except IOError:
+        print('Invalid File')
+        return False
+    except etree.XMLSyntaxError as err:
+        print('Schema validation error: {}'.format(err))
+        return False
 
 
 def is_xml(f):
@@ -0,0 +1,233 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import json
+import logging
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+import os
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+WorkItem = namedtuple('WorkItem', ['id', 'operation', 'payload', 'token', 'attempts'])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    operation TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    token TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS items_state ON items (state, lease_expires);
+"""
+
+
+def worker_name():
+    return '{}:{}:{}'.format(socket.gethostname(), os.getpid(), threading.current_thread().name)
+
+
+class WorkQueue(object):
+    """
+    Work queue stored in a SQLite database, shared by worker processes on one or more machines (through a
+    shared filesystem).
+
+    Workers lease items for `lease_seconds` and must renew the lease with `heartbeat` while they work on
+    them; items whose lease expires (e.g. because their worker crashed) are leased again to another worker.
+    Each lease carries a token and only the current lease holder can complete or fail an item, so every item
+    is completed exactly once. Items are retried until they have been attempted `max_attempts` times.
+    """
+
+    def __init__(self, path, lease_seconds=60, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        connection = sqlite3.connect(self.path, timeout=60)
+        try:
+            connection.executescript(_SCHEMA)
+        finally:
+            connection.close()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        return _Transaction(connection)
+
+    def put(self, operation, **payload):
+        """
+        Add a work item.
+        :param operation: The operation to run (e.g. 'create', 'upload', 'download')
+        :param payload: json serializable arguments of the operation
+        :return: The item id
+        """
+        with self._connect() as connection:
+            return connection.execute('INSERT INTO items (operation, payload) VALUES (?, ?)',
+                                      (operation, json.dumps(payload))).lastrowid
+
+    def lease(self, worker=None):
+        """
+        Lease the oldest pending item, or an item whose lease has expired.
+        :param worker: Name of the leasing worker (defaults to host:pid:thread)
+        :return: A WorkItem, or None if no item is available
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._connect() as connection:
+            # items whose last allowed attempt crashed are not retried
+            connection.execute('UPDATE items SET state = ?, error = ?, token = NULL '
+                               'WHERE state = ? AND lease_expires < ? AND attempts >= ?',
+                               (FAILED, 'lease expired', LEASED, now, self.max_attempts))
+            row = connection.execute(
+                'SELECT id, operation, payload, attempts FROM items '
+                'WHERE state = ? OR (state = ? AND lease_expires < ?) ORDER BY id LIMIT 1',
+                (PENDING, LEASED, now)).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                'UPDATE items SET state = ?, worker = ?, token = ?, lease_expires = ?, attempts = attempts + 1 '
+                'WHERE id = ?', (LEASED, worker or worker_name(), token, now + self.lease_seconds, row[0]))
+        return WorkItem(row[0], row[1], json.loads(row[2]), token, row[3] + 1)
+
+    def _update_leased(self, item, assignments, values):
+        with self._connect() as connection:
+            return connection.execute(
+                'UPDATE items SET {} WHERE id = ? AND token = ? AND state = ?'.format(assignments),
+                tuple(values) + (item.id, item.token, LEASED)).rowcount == 1
+
+    def heartbeat(self, item):
+        """
+        Renew the lease of an item.
+        :return: False if the lease was lost (it expired and the item was leased by another worker)
+        """
+        return self._update_leased(item, 'lease_expires = ?', [time.time() + self.lease_seconds])
+
+    def complete(self, item, result=None):
+        """
+        Mark an item as done.
+        :return: False if the lease was lost and the item was not completed by this worker
+        """
+        return self._update_leased(item, 'state = ?, result = ?, token = NULL', [DONE, json.dumps(result)])
+
+    def fail(self, item, error):
+        """
+        Release an item after a failed attempt; it is retried unless it has reached max_attempts.
+        :return: False if the lease was lost
+        """
+        state = FAILED if item.attempts >= self.max_attempts else PENDING
+        return self._update_leased(item, 'state = ?, error = ?, token = NULL', [state, str(error)])
+
+    def counts(self):
+        """Number of items per state"""
+        with self._connect() as connection:
+            counts = dict.fromkeys([PENDING, LEASED, DONE, FAILED], 0)
+            counts.update(connection.execute('SELECT state, COUNT(*) FROM items GROUP BY state').fetchall())
+            return counts
+
+    def results(self, state=DONE):
+        """
+        :return: Generator of (id, operation, payload, result, error) for the items in the given state
+        """
+        with self._connect() as connection:
+            rows = connection.execute('SELECT id, operation, payload, result, error FROM items WHERE state = ? '
+                                      'ORDER BY id', (state,)).fetchall()
+        for item_id, operation, payload, result, error in rows:
+            yield item_id, operation, json.loads(payload), json.loads(result) if result else None, error
+
+
+class _Transaction(object):
+    """Run the statements of a `with` block in one write transaction, then close the connection"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        # take the write lock up front, so two workers can't lease the same item
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+        finally:
+            self.connection.close()
+        return False
+
+
+class Heartbeat(object):
+    """Renew the lease of a work item from a background thread while it is being processed"""
+
+    def __init__(self, queue, item):
+        self.queue = queue
+        self.item = item
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        expires = time.time() + self.queue.lease_seconds
+        while not self._stop.wait(self.queue.lease_seconds / 3.0):
+            try:
+                renewed = self.queue.heartbeat(self.item)
+            except Exception as e:
+                # e.g. the database is locked; try again while the lease is still valid
+                logging.warning('Could not renew the lease of work item {}: {}'.format(self.item.id, e))
+                if time.time() < expires:
+                    continue
+                renewed = False
+            if not renewed:
+                logging.warning('Lost the lease of work item {}'.format(self.item.id))
+                self.lost = True
+                return
+            expires = time.time() + self.queue.lease_seconds
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
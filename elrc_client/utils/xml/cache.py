@@ -0,0 +1,185 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import hashlib
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+import xmltodict
+
+from elrc_client.utils.xml import parser
+
+
+# Marks the directories created by a ParseCache; its modification time records when they were last opened
+MARKER = '.elrc-parse-cache'
+FINGERPRINT_PATTERN = re.compile(r'^[0-9a-f]{16}$')
+
+
+def parser_fingerprint():
+    """
+    Identify the parser implementation: any change to the parser module (including its force_list) or to the
+    xmltodict version changes the fingerprint and invalidates the cached parse results.
+    """
+    digest = hashlib.sha256()
+    with open(parser.__file__.replace('.pyc', '.py'), 'rb') as f:
+        digest.update(f.read())
+    digest.update(repr(parser.FORCE_LIST).encode('utf-8'))
+    digest.update(xmltodict.__version__.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class ParseCache(object):
+    """
+    On-disk cache of `parser.parse` results, keyed by the hash of the xml content and the parser fingerprint.
+
+    Entries are pickled under <directory>/<fingerprint>/. When the cache is opened, the entries of other parser
+    versions that have not been opened for `stale_after` seconds are removed (other directories are never
+    touched, and client versions sharing the directory keep their own entries). When the cache grows beyond
+    `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, stale_after=30 * 24 * 3600):
+        self.max_bytes = max_bytes
+        self.fingerprint = parser_fingerprint()
+        self.directory = os.path.join(directory, self.fingerprint)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        self._mark(self.directory)
+        self._remove_stale(directory, time.time() - stale_after)
+        self._sizes = dict((entry.name, entry.stat().st_size) for entry in os.scandir(self.directory)
+                           if entry.name.endswith('.pickle'))
+        self._size = sum(self._sizes.values())
+
+    @staticmethod
+    def _mark(directory):
+        with open(os.path.join(directory, MARKER), 'a'):
+            pass
+        os.utime(os.path.join(directory, MARKER), None)
+
+    def _remove_stale(self, directory, before):
+        """Remove the cache directories of other parser versions last opened before the given time"""
+        for name in os.listdir(directory):
+            if name == self.fingerprint or not FINGERPRINT_PATTERN.match(name):
+                continue
+            try:
+                last_opened = os.path.getmtime(os.path.join(directory, name, MARKER))
+            except OSError:
+                # not created by a ParseCache
+                continue
+            if last_opened < before:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+    def key(self, content, **kwargs):
+        digest = hashlib.sha256(content)
+        if kwargs:
+            digest.update(repr(sorted(kwargs.items())).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pickle')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+        # the modification time orders entries for LRU eviction
+        os.utime(path, None)
+        return value
+
+    def put(self, key, value):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        name = key + '.pickle'
+        os.replace(tmp, os.path.join(self.directory, name))
+        with self._lock:
+            self._size += os.path.getsize(os.path.join(self.directory, name)) - self._sizes.get(name, 0)
+            self._sizes[name] = os.path.getsize(os.path.join(self.directory, name))
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in self._sizes:
+            try:
+                entries.append((os.path.getmtime(os.path.join(self.directory, name)), name))
+            except OSError:
+                entries.append((0, name))
+        for _, name in sorted(entries):
+            if self._size <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            self._size -= self._sizes.pop(name)
+
+    def parse(self, xml_input, **kwargs):
+        """
+        Same as `parser.parse`, served from the cache when the same content has been parsed before.
+        :param xml_input: xml bytes or string
+        """
+        content = xml_input.encode('utf-8') if isinstance(xml_input, str) else xml_input
+        key = self.key(content, **kwargs)
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = parser.parse(content, **kwargs)
+        self.put(key, value)
+        return value
+
+    def parse_file(self, path, **kwargs):
+        with open(path, 'rb') as f:
+            return self.parse(f.read(), **kwargs)
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            os.makedirs(self.directory)
+            self._mark(self.directory)
+            self._sizes = {}
+            self._size = 0
@@ -32,14 +32,21 @@
 # OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import sys
+
 import xmltodict
 from collections import OrderedDict
 
+from elrc_client.utils.profiling import phase, PARSE
+
 try:
     from defusedexpat import pyexpat as expat
 except ImportError:
     from xml.parsers import expat
 
+# Values up to this length are shared between parsed descriptions in lean mode
+SHARED_VALUE_LENGTH = 32
+
 
 class Parser(xmltodict._DictSAXHandler):
     def __init__(self,
@@ -55,7 +62,16 @@ class Parser(xmltodict._DictSAXHandler):
                  strip_whitespace=True,
                  namespace_separator=':',
                  namespaces=None,
-                 force_list=None):
+                 force_list=None,
+                 lean=False,
+                 freeze_lists=False):
+        """
+        :param lean: Build plain dicts instead of OrderedDicts and intern their keys and short values, to reduce
+        the memory held by large or many parsed descriptions (the output has the same shape and json serialization)
+        :param freeze_lists: Store repeated elements as tuples instead of lists once their parent element is closed
+        """
+        if lean:
+            dict_constructor = dict
         self.path = []
         self.stack = []
         self.data = []
@@ -74,13 +90,24 @@ class Parser(xmltodict._DictSAXHandler):
         self.namespaces = namespaces
         self.namespace_declarations = OrderedDict()
         self.force_list = force_list
+        self.lean = lean
+        self.freeze_lists = freeze_lists
         self.attrs = dict()
 
     def _attrs_to_dict(self, attrs):
         if isinstance(attrs, dict):
             return attrs
+        if not attrs:
+            # most elements have no attributes; only the truthiness of an empty attrs dict is ever used
+            return None
         return self.dict_constructor(zip(attrs[0::2], attrs[1::2]))
 
+    @staticmethod
+    def _freeze(item):
+        for key, value in item.items():
+            if type(value) is list:
+                item[key] = tuple(value)
+
     def startElement(self, full_name, attrs):
         name = self._build_name(full_name)
         self.attrs = self._attrs_to_dict(attrs)
@@ -90,8 +117,7 @@ class Parser(xmltodict._DictSAXHandler):
         self.path.append((name, self.attrs or None))
         if len(self.path) > self.item_depth:
             self.stack.append((self.item, self.data))
-            if self.xml_attribs:
-                attr_entries = []
+            if self.xml_attribs and self.attrs:
                 entry = dict()
                 for key, value in self.attrs.items():
                     if key not in ['xmlns', 'xmlns:xsi', 'xsi:schemaLocation']:
@@ -100,7 +126,6 @@ class Parser(xmltodict._DictSAXHandler):
                         #     entry = self.postprocessor(self.path, key, value)
 
                         entry.update({key: value})
-                attr_entries.append(entry)
                 self.attrs = entry
             else:
                 self.attrs = None
@@ -114,6 +139,8 @@ class Parser(xmltodict._DictSAXHandler):
             if item is None:
                 item = (None if not self.data
                         else self.cdata_separator.join(self.data))
+            elif self.freeze_lists and isinstance(item, dict):
+                self._freeze(item)
             should_continue = self.item_callback(self.path, item)
             if not should_continue:
                 raise xmltodict.ParsingInterrupted()
@@ -127,6 +154,8 @@ class Parser(xmltodict._DictSAXHandler):
             if data and self.force_cdata and item is None:
                 item = self.dict_constructor()
             if item is not None:
+                if self.freeze_lists and isinstance(item, dict):
+                    self._freeze(item)
                 if data:
                     if self.attrs:
                         self.push_data(item, self.attrs['@lang'], data)
@@ -151,6 +180,11 @@ class Parser(xmltodict._DictSAXHandler):
             if result is None:
                 return item
             key, data = result
+        if self.lean:
+            key = sys.intern(key)
+            # short values are mostly controlled vocabulary (languageScript, sizeUnit, ...) repeated across elements
+            if type(data) is str and len(data) <= SHARED_VALUE_LENGTH:
+                data = sys.intern(data)
         if item is None:
             item = self.dict_constructor()
         try:
@@ -169,35 +203,29 @@ class Parser(xmltodict._DictSAXHandler):
         return item
 
 
-def parse(xml_input, encoding=None, expat=expat, process_namespaces=False,
-          namespace_separator=':', disable_entities=True, **kwargs):
-    force_list = [
-        'domainSetInfo', 'evaluationCriteria', 'inputInfoType_model.resourceType', 'relationInfo',
-        'domainSetInfo.domainId', 'annotationInfo', 'validationInfo', 'textClassificationInfo',
-        'telephoneNumber', 'requiredLRs', 'annotationManual', 'metadataLanguageName', 'appropriatenessForDSI',
-        'evaluationTool', 'operatingSystem', 'metadataLanguageId', 'originalSource', 'documentation',
-        'segmentationLevel', 'encodingLevel', 'variant', 'fundingCountryId', 'funder', 'languageSetInfo',
-        'inputInfoType_model.annotationType', 'outputInfoType_model.annotationType',
-        'affiliation', 'fundingType', 'validator', 'identifier', 'theoreticModel',
-        'creationTool', 'distributionInfo', 'licenceInfo', 'evaluationLevel', 'sizePerLanguage',
-        'languageVarietyName', 'restrictionsOfUse', 'domainSetInfo.domain', 'contactPerson',
-        'evaluationReport', 'outputInfoType_model.resourceType', 'domainSetInfo.subdomainId', 'evaluationMeasure',
-        'keywords', 'fundingCountry', 'url', 'author', 'iprHolder', 'annotationTool', 'email',
-        'requiredSoftware', 'domainInfo', 'languageVarietyInfo', 'conformanceToStandardsBestPractices',
-        'characterEncodingInfo', 'extratextualInformation', 'textFormatInfo', 'distributionMedium',
-        'corpusTextInfo', 'implementationLanguage', 'publisher', 'externalRef', 'languageInfo',
-        'resourceCreator', 'evaluator', 'executionLocation', 'domainSetInfo.subdomain', 'samplesLocation',
-        'linguisticInformation', 'function', 'fundingProject', 'downloadLocation', 'sizeInfo', 'editor',
-        'task', 'extraTextualInformationUnit', 'metadataCreator', 'validationReport',
-        'outputInfoType_model.mediaType'
-    ]
-
-    handler = Parser(namespace_separator=namespace_separator, force_list=force_list,
-                     **kwargs)
-    if isinstance(xml_input, xmltodict._unicode):
-        if not encoding:
-            encoding = 'utf-8'
-        xml_input = xml_input.encode(encoding)
+FORCE_LIST = [
+    'domainSetInfo', 'evaluationCriteria', 'inputInfoType_model.resourceType', 'relationInfo',
+    'domainSetInfo.domainId', 'annotationInfo', 'validationInfo', 'textClassificationInfo',
+    'telephoneNumber', 'requiredLRs', 'annotationManual', 'metadataLanguageName', 'appropriatenessForDSI',
+    'evaluationTool', 'operatingSystem', 'metadataLanguageId', 'originalSource', 'documentation',
+    'segmentationLevel', 'encodingLevel', 'variant', 'fundingCountryId', 'funder', 'languageSetInfo',
+    'inputInfoType_model.annotationType', 'outputInfoType_model.annotationType',
+    'affiliation', 'fundingType', 'validator', 'identifier', 'theoreticModel',
+    'creationTool', 'distributionInfo', 'licenceInfo', 'evaluationLevel', 'sizePerLanguage',
+    'languageVarietyName', 'restrictionsOfUse', 'domainSetInfo.domain', 'contactPerson',
+    'evaluationReport', 'outputInfoType_model.resourceType', 'domainSetInfo.subdomainId', 'evaluationMeasure',
+    'keywords', 'fundingCountry', 'url', 'author', 'iprHolder', 'annotationTool', 'email',
+    'requiredSoftware', 'domainInfo', 'languageVarietyInfo', 'conformanceToStandardsBestPractices',
+    'characterEncodingInfo', 'extratextualInformation', 'textFormatInfo', 'distributionMedium',
+    'corpusTextInfo', 'implementationLanguage', 'publisher', 'externalRef', 'languageInfo',
+    'resourceCreator', 'evaluator', 'executionLocation', 'domainSetInfo.subdomain', 'samplesLocation',
+    'linguisticInformation', 'function', 'fundingProject', 'downloadLocation', 'sizeInfo', 'editor',
+    'task', 'extraTextualInformationUnit', 'metadataCreator', 'validationReport',
+    'outputInfoType_model.mediaType'
+]
+
+
+def _create_parser(handler, encoding, expat, process_namespaces, namespace_separator, disable_entities):
     if not process_namespaces:
         namespace_separator = None
     parser = expat.ParserCreate(
@@ -225,8 +253,67 @@ def parse(xml_input, encoding=None, expat=expat, process_namespaces=False,
             parser.DefaultHandler = lambda x: None
             # Expects an integer return; zero means failure -> expat.ExpatError.
             parser.ExternalEntityRefHandler = lambda *x: 1
+    return parser
+
+
+def parse(xml_input, encoding=None, expat=expat, process_namespaces=False,
+          namespace_separator=':', disable_entities=True, **kwargs):
+    handler = Parser(namespace_separator=namespace_separator, force_list=FORCE_LIST,
+                     **kwargs)
+    if isinstance(xml_input, xmltodict._unicode):
+        if not encoding:
+            encoding = 'utf-8'
+        xml_input = xml_input.encode(encoding)
+    parser = _create_parser(handler, encoding, expat, process_namespaces, namespace_separator, disable_entities)
+    with phase(PARSE):
+        if hasattr(xml_input, 'read'):
+            parser.ParseFile(xml_input)
+        else:
+            parser.Parse(xml_input, True)
+    return handler.item
+
+
+def iterparse(xml_input, item_depth=2, encoding=None, expat=expat, process_namespaces=False,
+              namespace_separator=':', disable_entities=True, chunk_size=1 << 16, **kwargs):
+    """
+    Parse a document holding many resource descriptions (e.g. a bulk export with resourceInfo elements under
+    a common root), yielding each description as soon as its element closes, so that only one description
+    is held in memory at a time.
+    :param xml_input: An xml string or a file object
+    :param item_depth: Depth of the elements to yield (the document root is at depth 1)
+    :param chunk_size: Number of bytes/characters fed to expat at a time when reading from a file object
+    :return: Generator of dicts keyed by the element name, e.g. {'resourceInfo': {...}}, the same shape `parse`
+    returns for a single description
+    """
+    items = []
+
+    def collect(path, item):
+        items.append(handler.dict_constructor([(path[-1][0], item)]))
+        return True
+
+    handler = Parser(item_depth=item_depth, item_callback=collect, namespace_separator=namespace_separator,
+                     force_list=FORCE_LIST, **kwargs)
     if hasattr(xml_input, 'read'):
-        parser.ParseFile(xml_input)
+        # read until an empty chunk ('' or b'' depending on the file mode)
+        chunks = iter(lambda: xml_input.read(chunk_size), xml_input.read(0))
     else:
-        parser.Parse(xml_input, True)
-    return handler.item
+        chunks = iter([xml_input])
+    parser = None
+    for chunk in chunks:
+        if isinstance(chunk, xmltodict._unicode):
+            encoding = encoding or 'utf-8'
+            chunk = chunk.encode(encoding)
+        if parser is None:
+            parser = _create_parser(handler, encoding, expat, process_namespaces, namespace_separator,
+                                    disable_entities)
+        with phase(PARSE):
+            parser.Parse(chunk, False)
+        while items:
+            yield items.pop(0)
+    if parser is None:
+        parser = _create_parser(handler, encoding, expat, process_namespaces, namespace_separator,
+                                disable_entities)
+    with phase(PARSE):
+        parser.Parse(b'', True)
+    while items:
+        yield items.pop(0)
@@ -0,0 +1,93 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import threading
+
+import xmltodict
+from lxml import etree
+
+from elrc_client.utils.profiling import phase, PARSE
+from elrc_client.utils.xml import parser
+
+_schemas = {}
+_schemas_lock = threading.Lock()
+
+
+def load_schema(location):
+    """
+    Get the compiled xml schema at a location, compiling it on first use only.
+    :param location: Path or http url of the .xsd file (as loaded by lxml)
+    :return: An lxml XMLSchema
+    :raise IOError: If the location is an https url, which lxml can not load
+    """
+    if location.lower().startswith('https://'):
+        raise IOError('Can not load schema {} over https, use a local copy of it'.format(location))
+    with _schemas_lock:
+        schema = _schemas.get(location)
+        if schema is None:
+            schema = _schemas[location] = etree.XMLSchema(file=location)
+        return schema
+
+
+def validate_and_parse(xml_input, schema, encoding=None, chunk_size=1 << 16, **kwargs):
+    """
+    Validate an xml description against a schema and convert it to the dictionary `parser.parse` returns, in a
+    single pass over the input: each chunk read is fed both to a validating lxml parser and to the ELRC parser,
+    so the file is never held in memory as a whole nor read twice.
+    :param xml_input: An xml string or a file object (opened in binary mode)
+    :param schema: An lxml XMLSchema, see `load_schema`
+    :param chunk_size: Number of bytes read at a time from a file object
+    :param kwargs: Parser options, e.g. lean=True
+    :return: The description as a dictionary
+    :raise etree.XMLSyntaxError: If the document is not well formed or not valid against the schema
+    """
+    handler = parser.Parser(force_list=parser.FORCE_LIST, **kwargs)
+    converter = parser._create_parser(handler, encoding, parser.expat, False, ':', True)
+    validator = etree.XMLParser(schema=schema, resolve_entities=False, no_network=True, huge_tree=True)
+    if hasattr(xml_input, 'read'):
+        chunks = iter(lambda: xml_input.read(chunk_size), b'')
+    else:
+        if isinstance(xml_input, xmltodict._unicode):
+            xml_input = xml_input.encode(encoding or 'utf-8')
+        chunks = iter([xml_input])
+    with phase(PARSE):
+        try:
+            for chunk in chunks:
+                validator.feed(chunk)
+                converter.Parse(chunk, False)
+            converter.Parse(b'', True)
+        except parser.expat.ExpatError as e:
+            raise etree.XMLSyntaxError(str(e), None, e.lineno, e.offset)
+        validator.close()
+    return handler.item
@@ -0,0 +1,285 @@
+# ELRC-SHARE-client API source code BSD-3-clause licence
+#
+# Copyright (c) 2019
+#
+# This software has been developed by the Institute for Language and
+# Speech Processing/Athena Research Centre as part of Service
+# Contract 30-CE-0816330/00-16 for the European Union represented by
+# the European Commission.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice,
+# this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+# this list of conditions and the following disclaimer in the documentation
+# and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors
+# may be used to endorse or promote products derived from this software without
+# specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import fnmatch
+import shutil
+import struct
+import tempfile
+import zipfile
+import zlib
+
+import os
+
+_LOCAL_HEADER = b'PK\x03\x04'
+_CENTRAL_HEADER = b'PK\x01\x02'
+_END_OF_CENTRAL_DIR = b'PK\x05\x06'
+_ZIP64_END_OF_CENTRAL_DIR = b'PK\x06\x06'
+_DATA_DESCRIPTOR = b'PK\x07\x08'
+
+# Archives that need seeking are kept in memory up to this size, then spooled to a temporary file
+SPOOL_MEMORY_SIZE = 64 * 1024 * 1024
+
+
+class StreamingNotSupported(Exception):
+    """The archive can not be extracted without seeking (e.g. stored members of unknown size)"""
+
+
+class _Stream(object):
+    """Byte reader over an iterable of chunks, keeping track of its position"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = b''
+        self.position = 0
+
+    def _fill(self, n):
+        parts = [self._buffer]
+        available = len(self._buffer)
+        while available < n:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            parts.append(chunk)
+            available += len(chunk)
+        self._buffer = b''.join(parts)
+
+    def read(self, n):
+        """Read exactly n bytes, fewer only at the end of the stream"""
+        if len(self._buffer) < n:
+            self._fill(n)
+        data, self._buffer = self._buffer[:n], self._buffer[n:]
+        self.position += len(data)
+        return data
+
+    def read_some(self, n):
+        """Read up to n bytes, whatever is available (an empty result means the end of the stream)"""
+        if not self._buffer:
+            self._fill(1)
+        data, self._buffer = self._buffer[:n], self._buffer[n:]
+        self.position += len(data)
+        return data
+
+    def unread(self, data):
+        self._buffer = data + self._buffer
+        self.position -= len(data)
+
+    def remaining(self):
+        """Iterate over the unread bytes"""
+        if self._buffer:
+            yield self._buffer
+            self._buffer = b''
+        for chunk in self._chunks:
+            yield chunk
+
+
+def matches(name, patterns):
+    if not patterns:
+        return True
+    return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(os.path.basename(name), p) for p in patterns)
+
+
+def _target_path(target_dir, name):
+    """Resolve a member name inside target_dir, refusing absolute paths and '..' components"""
+    parts = [p for p in name.replace('\\', '/').split('/') if p not in ('', '.')]
+    if not parts or '..' in parts or ':' in parts[0]:
+        raise zipfile.BadZipFile('Unsafe member name: {}'.format(name))
+    return os.path.join(target_dir, *parts)
+
+
+def _zip64_sizes(extra, compressed, uncompressed):
+    while len(extra) >= 4:
+        header_id, size = struct.unpack('<HH', extra[:4])
+        if header_id == 0x0001:
+            values = extra[4:4 + size]
+            if uncompressed == 0xFFFFFFFF:
+                uncompressed, values = struct.unpack('<Q', values[:8])[0], values[8:]
+            if compressed == 0xFFFFFFFF:
+                compressed = struct.unpack('<Q', values[:8])[0]
+            return compressed, uncompressed, True
+        extra = extra[4 + size:]
+    return compressed, uncompressed, False
+
+
+def _member_data(stream, method, compressed, has_descriptor):
+    """Yield the uncompressed data of a member, leaving the stream positioned after its data"""
+    if method == zipfile.ZIP_DEFLATED:
+        decompressor = zlib.decompressobj(-15)
+        remaining = None if has_descriptor else compressed
+        while not decompressor.eof:
+            data = stream.read_some(1 << 16 if remaining is None else min(1 << 16, remaining))
+            if not data:
+                raise zipfile.BadZipFile('Truncated archive')
+            if remaining is not None:
+                remaining -= len(data)
+            yield decompressor.decompress(data)
+        stream.unread(decompressor.unused_data)
+        if remaining:
+            stream.read(remaining)
+    else:
+        remaining = compressed
+        while remaining:
+            data = stream.read_some(min(1 << 16, remaining))
+            if not data:
+                raise zipfile.BadZipFile('Truncated archive')
+            remaining -= len(data)
+            yield data
+
+
+def extract_stream(chunks, target_dir, patterns=None):
+    """
+    Extract a zip archive while it is being received, without writing the archive itself to disk.
+    Members are read sequentially from their local headers; the central directory is not needed.
+    :param chunks: Iterable of bytes, e.g. response.iter_content()
+    :param target_dir: Directory where the members are extracted
+    :param patterns: Glob patterns (e.g. ['*.tmx']) matched against member paths and file names; only
+    matching members are extracted
+    :return: The paths of the extracted files
+    :raise StreamingNotSupported: If a member can not be extracted without seeking (stored members written
+    with a data descriptor, encrypted members or unsupported compression methods)
+    """
+    extracted = []
+    _extract_members(_Stream(chunks), target_dir, patterns, extracted)
+    return extracted
+
+
+def _extract_members(stream, target_dir, patterns, extracted):
+    """
+    Extract members from a _Stream, appending their paths to `extracted`. When a member can not be streamed,
+    StreamingNotSupported is raised with the stream positioned at the start of its local header.
+    """
+    while True:
+        signature = stream.read(4)
+        if signature in (_CENTRAL_HEADER, _END_OF_CENTRAL_DIR, _ZIP64_END_OF_CENTRAL_DIR, b''):
+            return
+        if signature != _LOCAL_HEADER:
+            raise zipfile.BadZipFile('Unexpected signature in archive: {!r}'.format(signature))
+        header = stream.read(26)
+        if len(header) < 26:
+            raise zipfile.BadZipFile('Truncated archive')
+        (_, flags, method, _, _, crc, compressed, uncompressed, name_length,
+         extra_length) = struct.unpack('<HHHHHIIIHH', header)
+        raw_name, extra = stream.read(name_length), stream.read(extra_length)
+        name = raw_name.decode('utf-8' if flags & 0x800 else 'cp437')
+        compressed, uncompressed, zip64 = _zip64_sizes(extra, compressed, uncompressed)
+        has_descriptor = bool(flags & 0x08)
+        error = None
+        if flags & 0x01:
+            error = 'Encrypted member: {}'.format(name)
+        elif method not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            error = 'Unsupported compression method {} for {}'.format(method, name)
+        elif method == zipfile.ZIP_STORED and has_descriptor:
+            error = 'Stored member of unknown size: {}'.format(name)
+        if error is not None:
+            stream.unread(signature + header + raw_name + extra)
+            raise StreamingNotSupported(error)
+
+        data = _member_data(stream, method, compressed, has_descriptor)
+        if name.endswith('/') or not matches(name, patterns):
+            for _ in data:
+                pass
+            if name.endswith('/') and matches(name, patterns):
+                os.makedirs(_target_path(target_dir, name), exist_ok=True)
+            checksum = None
+        else:
+            path = _target_path(target_dir, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            checksum = 0
+            with open(path, 'wb') as out:
+                for block in data:
+                    checksum = zlib.crc32(block, checksum)
+                    out.write(block)
+            extracted.append(path)
+
+        if has_descriptor:
+            descriptor = stream.read(4)
+            if descriptor != _DATA_DESCRIPTOR:
+                stream.unread(descriptor)
+            fields = stream.read(20 if zip64 else 12)
+            crc = struct.unpack('<I', fields[:4])[0]
+        if checksum is not None and checksum != crc:
+            raise zipfile.BadZipFile('Bad CRC-32 for member: {}'.format(name))
+
+
+def extract(chunks, target_dir, patterns=None):
+    """
+    Extract a zip archive while it is being received (see `extract_stream`). From the first member that can not
+    be streamed on, the rest of the archive is received into a spooled temporary file and extracted from there,
+    so the archive is received only once and the members already extracted are not written again.
+    :return: The paths of the extracted files
+    """
+    stream = _Stream(chunks)
+    extracted = []
+    try:
+        _extract_members(stream, target_dir, patterns, extracted)
+        return extracted
+    except StreamingNotSupported:
+        pass
+    extracted.extend(_extract_spooled(stream.remaining(), target_dir, patterns, offset=stream.position))
+    return extracted
+
+
+def extract_spooled(chunks, target_dir, patterns=None):
+    """
+    Extract a zip archive received as chunks through a spooled temporary file, for archives that
+    `extract_stream` can not handle.
+    :return: The paths of the extracted files
+    """
+    return _extract_spooled(chunks, target_dir, patterns)
+
+
+def _extract_spooled(chunks, target_dir, patterns, offset=0):
+    """
+    :param chunks: The bytes of the archive from `offset` on
+    :param offset: Position of `chunks` in the archive; the members stored before it are skipped, and the bytes
+    before it are left as a (sparse) gap in the temporary file since only the central directory and the members
+    after it are read
+    """
+    extracted = []
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_SIZE) as spool:
+        if offset > SPOOL_MEMORY_SIZE:
+            spool.rollover()
+        spool.seek(offset)
+        for chunk in chunks:
+            spool.write(chunk)
+        spool.seek(0)
+        with zipfile.ZipFile(spool) as archive:
+            for info in archive.infolist():
+                if info.header_offset < offset or info.is_dir() or not matches(info.filename, patterns):
+                    continue
+                path = _target_path(target_dir, info.filename)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with archive.open(info) as member, open(path, 'wb') as out:
+                    shutil.copyfileobj(member, out)
+                extracted.append(path)
+    return extracted